@@ -11,6 +11,10 @@ current functionality supports S3, SMB, and local Posix interfaces. For each of
 utilities for downloading, uploading, moving, and locating files (per the standard file
 structure) are made available. Classes defined here can be extended to support additional
 endpoints if so desired.
+
+Attributes:
+    transfer_pool (ThreadPoolExecutor): Pool used to transfer the files of a frame
+        range concurrently.
 """
 
 import glob
@@ -23,7 +27,9 @@ import string
 import subprocess
 import sys
 import tarfile
+from concurrent.futures import ThreadPoolExecutor
 from difflib import SequenceMatcher
+from functools import lru_cache
 from shutil import copyfile, rmtree
 
 import netifaces
@@ -36,6 +42,8 @@ sys.path.append(os.path.join(dir_scripts, "util"))
 import config
 from scripts.util.system_util import get_os_type_local, image_type_paths, run_command
 
+transfer_pool = ThreadPoolExecutor(max_workers=16)
+
 
 class Address:
 
@@ -119,7 +127,15 @@ class NetcatClient:
 
         return "\n".join(result)
 
-    def run_script(self, path):
+    def get_script_cmds(self, path):
+        """Constructs the commands that send a local script to the host and run it there.
+
+        Args:
+            path (str): Path to the local script.
+
+        Returns:
+            list[str]: Commands to run over netcat.
+        """
         filename = os.path.basename(path)
 
         # File is "sent" by creating a file in destination and appending lines to it
@@ -128,7 +144,10 @@ class NetcatClient:
             for line in f:
                 cmds.append(f'echo "{line.strip()}" >> {filename}')
         cmds.append(f"/bin/bash {filename}")
-        self.run(cmds)
+        return cmds
+
+    def run_script(self, path):
+        self.run(self.get_script_cmds(path))
 
     def run_async(self, cmds):
         """Asynchronously runs a series of commands over netcat.
@@ -246,8 +265,10 @@ class LAN:
         return self.local_ip
 
 
+@lru_cache(maxsize=None)
 def get_os_type(ip):
-    """Determines the operating system of the machine assuming it can be reached.
+    """Determines the operating system of the machine assuming it can be reached. The
+    result is cached per IP, since it does not change over the lifetime of the script.
 
     Args:
         ip (str): IP of the machine in interest.
@@ -267,6 +288,7 @@ def get_os_type(ip):
     return get_os_type_local(platform)
 
 
+@lru_cache(maxsize=None)
 def _get_image_root_type(image_type):
     """Determines which root an image type is located in.
 
@@ -312,8 +334,10 @@ def _get_image_root_type(image_type):
     return root_map[image_type]
 
 
+@lru_cache(maxsize=4096)
 def get_frame_name(frame):
-    """Gets the frame name for a frame number.
+    """Gets the frame name for a frame number. Names are cached, since the same frames
+    are named for every job over a frame range.
 
     Args:
         frame (int): Frame number.
@@ -378,10 +402,14 @@ def _netop_helper(netop, src, dst, frame_fns):
         bool: Success of network operation completion.
     """
     # Both list and string (resp. for multi and single frame) calls are supported
-    completed = True
-    for frame_fn in frame_fns:
-        completed &= netop(os.path.join(src, frame_fn), os.path.join(dst, frame_fn))
-    return completed
+    # Each transfer is bound by request latency, so they are all kept in flight at once
+    completed = transfer_pool.map(
+        lambda frame_fn: netop(
+            os.path.join(src, frame_fn), os.path.join(dst, frame_fn)
+        ),
+        frame_fns,
+    )
+    return all(list(completed))
 
 
 def download_rig(msg):
@@ -571,33 +599,49 @@ def local_rig_path(msg):
     return msg["rig"].replace(msg["input_root"], config.DOCKER_INPUT_ROOT)
 
 
-def local_image_type_path(msg, image_type, level=None):
-    """Gets local path to the directory for an image type.
+@lru_cache(maxsize=1024)
+def _image_type_path(input_root, output_root, image_type, level):
+    """Gets the path to the directory for an image type under the given roots. Paths are
+    computed once per distinct set of arguments.
 
     Args:
-        msg (dict[str, str]): Message received from RabbitMQ publisher.
+        input_root (str): Path to the root of the input image types.
+        output_root (str): Path to the root of the output image types.
         image_type (str): Name of an image type (re: source/util/ImageTypes.h).
-        level (int, optional): Image level to be returned. If None is passed in, the
-            location of the full-size images is returned.
+        level (int): Image level to be returned. If None is passed in, the location of
+            the full-size images is returned.
 
     Returns:
-        str: Path to local image type directory.
+        str: Path to image type directory.
     """
     if level is not None:
         image_type = config.type_to_levels_type[image_type]
 
     image_root_type = _get_image_root_type(image_type)
-    image_root = (
-        config.DOCKER_INPUT_ROOT
-        if image_root_type == "input"
-        else config.DOCKER_OUTPUT_ROOT
-    )
+    image_root = input_root if image_root_type == "input" else output_root
     image_type_dir = os.path.join(image_root, image_type_paths[image_type])
     if level is None:
         return image_type_dir
     return os.path.join(image_type_dir, f"level_{level}")
 
 
+def local_image_type_path(msg, image_type, level=None):
+    """Gets local path to the directory for an image type.
+
+    Args:
+        msg (dict[str, str]): Message received from RabbitMQ publisher.
+        image_type (str): Name of an image type (re: source/util/ImageTypes.h).
+        level (int, optional): Image level to be returned. If None is passed in, the
+            location of the full-size images is returned.
+
+    Returns:
+        str: Path to local image type directory.
+    """
+    return _image_type_path(
+        config.DOCKER_INPUT_ROOT, config.DOCKER_OUTPUT_ROOT, image_type, level
+    )
+
+
 def remote_image_type_path(msg, image_type, level=None):
     """Gets remote path to the directory for an image type.
 
@@ -610,16 +654,7 @@ def remote_image_type_path(msg, image_type, level=None):
     Returns:
         str: Path to remote image type directory.
     """
-    if level is not None:
-        image_type = config.type_to_levels_type[image_type]
-
-    image_root_type = _get_image_root_type(image_type)
-    image_root = msg["input_root"] if image_root_type == "input" else msg["output_root"]
-    image_type_dir = os.path.join(image_root, image_type_paths[image_type])
-
-    if level is None:
-        return image_type_dir
-    return os.path.join(image_type_dir, f"level_{level}")
+    return _image_type_path(msg["input_root"], msg["output_root"], image_type, level)
 
 
 def download(src, dst, filters=None, run_silently=False):
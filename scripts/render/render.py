@@ -49,6 +49,7 @@ Attributes:
 """
 
 import logging
+import math
 import os
 import sys
 
@@ -133,6 +134,41 @@ def set_input_param(base_params, image_type):
     )
 
 
+def get_frame_chunks(first, last, chunk_size, num_workers=None):
+    """Splits a frame range into chunks to be distributed to workers.
+
+    Workers pull chunks from a shared queue as they become free. With guided scheduling, each
+    chunk takes 1/(2 * num_workers) of the frames left, but never fewer than chunk_size. Large
+    chunks early on amortize per-chunk setup, while the small chunks at the end keep workers
+    from idling behind a straggler.
+
+    Args:
+        first (int): First frame of the range.
+        last (int): Last frame of the range (inclusive).
+        chunk_size (int): (Minimum) number of frames in a chunk.
+        num_workers (float, optional): Number of workers pulling chunks, in units of the
+            slowest worker for heterogeneous farms. Chunks are of fixed size if None is
+            passed in.
+
+    Returns:
+        list[dict[str, str]]: List of frame chunk with keys "first" and "last" corresponding
+            to the appropriate frame names for the chunk.
+    """
+    frame_chunks = []
+    start = first
+    while start <= last:
+        size = chunk_size
+        if num_workers:
+            remaining = last - start + 1
+            size = max(chunk_size, math.ceil(remaining / (2 * num_workers)))
+        end = min(last, start + size - 1)
+        frame_chunks.append(
+            {"first": get_frame_name(start), "last": get_frame_name(end)}
+        )
+        start = end + 1
+    return frame_chunks
+
+
 def main():
     """Runs the main render pipeline with the parameters passed in through command line args."""
     base_params = {
@@ -164,14 +200,17 @@ def main():
         for image_type in input_image_types:
             set_input_param(base_params, image_type)
 
-    # frame_chunks use the Python range standard where first is included but last excluded
-    frame_chunks = [
-        {
-            "first": get_frame_name(frame),
-            "last": get_frame_name(min(int(FLAGS.last), frame + FLAGS.chunk_size - 1)),
-        }
-        for frame in range(int(FLAGS.first), int(FLAGS.last) + 1, FLAGS.chunk_size)
-    ]
+    num_workers = None
+    if FLAGS.guided_chunks:
+        # Chunks are sized so the slowest worker finishes its last chunk alongside the rest
+        workers = setup.parse_workers(FLAGS.workers)
+        slowest = min(weight for _, _, weight in workers)
+        num_workers = (
+            sum(replicas * weight for _, replicas, weight in workers) / slowest
+        )
+    frame_chunks = get_frame_chunks(
+        int(FLAGS.first), int(FLAGS.last), FLAGS.chunk_size, num_workers
+    )
     if FLAGS.background_frame == "":
         background_frame = None
     else:
@@ -22,76 +22,389 @@ Example:
 
 Attributes:
     FLAGS (absl.flags._flagvalues.FlagValues): Globally defined flags for resize.py.
+    IO_THREADS (int): Number of threads each for decoding and writing images.
+    OPENCL_THREADS_PER_RESIZE (int): Number of cores a single OpenCL resize is expected to
+        keep busy, used to scale down the number of concurrent resizes.
 """
 
 
 import glob
 import json
-import multiprocessing as mp
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 
 import config
 import cv2
-import imageio
+import numpy as np
 from absl import app, flags
-from network import get_frame_name, get_sample_file
+from network import get_frame_name
 
 FLAGS = flags.FLAGS
-imageio.plugins.freeimage.download()  # allows PFM file I/O
 
+# Number of threads each for decoding and writing images
+IO_THREADS = 8
 
-def get_frame_path(src_dir, camera, frame):
-    sample_file = get_sample_file(os.path.join(src_dir, camera))
-    _, img_ext = os.path.splitext(sample_file)
-    frame_fn = f"{frame}{img_ext}"
-    return os.path.join(src_dir, camera, frame_fn)
+# Number of cores a single OpenCL resize is expected to keep busy
+OPENCL_THREADS_PER_RESIZE = 4
 
 
-def resize_camera(src_dir, dst_dir, camera, rig_resolution, frame, threshold):
-    """Resizes a frame for a given camera to the appropriate pyramid level sizes.
-    Files are saved in level_0/[camera], ..., level_9/[camera] in the destination directory.
+def read_pfm(path):
+    """Reads a PFM image.
 
     Args:
-        src_dir (str): Path to the source directory.
-        dst_dir (str): Path to the destination directory.
-        camera (str): Name of the camera to be resized.
-        rig_resolution (int): Width of the resize. Aspect ratio is maintained.
-        frame (str): Name of the frame to render.
-        threshold (int): Threshold to be used for binary thresholding. No thresholding
-            is performed if None is passed in.
+        path (str): Path to the PFM file.
+
+    Returns:
+        np.array: float32 image of shape (height, width, 3) for color or (height, width)
+            for grayscale files, with the first row at the top.
     """
-    original_file = get_frame_path(src_dir, camera, frame)
-    frame_fn = os.path.basename(original_file)
-    _, ext = os.path.splitext(frame_fn)
+    with open(path, "rb") as f:
+        header = f.readline().strip()
+        if header not in (b"PF", b"Pf"):
+            raise Exception(f"Invalid PFM header in {path}: {header}")
+        width, height = (int(dim) for dim in f.readline().split())
+        scale = float(f.readline().strip())
+        dtype = "<f4" if scale < 0 else ">f4"
+        shape = (height, width, 3) if header == b"PF" else (height, width)
+        data = np.frombuffer(f.read(), dtype=dtype, count=np.prod(shape))
+    # PFM rows are stored bottom to top
+    return data.reshape(shape)[::-1].astype(np.float32)
+
+
+def write_pfm(path, img):
+    """Writes a PFM image.
+
+    Args:
+        path (str): Path to the PFM file.
+        img (np.array): Image of shape (height, width, 3) or (height, width), with the
+            first row at the top.
+    """
+    color = img.ndim == 3 and img.shape[2] == 3
+    height, width = img.shape[:2]
+    data = np.ascontiguousarray(img[::-1], dtype="<f4")
+    with open(path, "wb") as f:
+        f.write(f"{'PF' if color else 'Pf'}\n{width} {height}\n-1\n".encode())
+        f.write(data.tobytes())
+
+
+def _read_image(path):
+    """Reads an image from disk.
+
+    Args:
+        path (str): Path to the image.
+
+    Returns:
+        np.array: Decoded image.
+    """
+    if os.path.splitext(path)[1] == ".pfm":
+        return read_pfm(path)
+    img = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if img is None:
+        raise Exception(f"Failed to read image: {path}")
+    return img
+
+
+def cuda_enabled():
+    """Checks whether OpenCV was built with CUDA and has a usable device.
+
+    Returns:
+        bool: Whether resizing can be run on the GPU.
+    """
+    return hasattr(cv2, "cuda") and cv2.cuda.getCudaEnabledDeviceCount() > 0
+
+
+def _write_image(path, img, ext):
     if ext == ".pfm":
-        img = imageio.imread(original_file)
-    else:
-        img = cv2.imread(original_file, cv2.IMREAD_UNCHANGED)
+        write_pfm(path, img)
+        return
+
+    # Encoding in memory and writing the buffer with a single unbuffered write avoids
+    # multiple small flushes, which stall on SMB mounts
+    ok, buf = cv2.imencode(ext, img)
+    if not ok:
+        raise Exception(f"Failed to encode image: {path}")
+    data = memoryview(buf).cast("B")
+    open_flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+    fd = os.open(path, open_flags, 0o644)
+    try:
+        while data:
+            data = data[os.write(fd, data) :]
+    finally:
+        os.close(fd)
+
+
+def get_level_sizes(rig_resolution):
+    """Computes the sizes of the pyramid levels for a camera.
+
+    Args:
+        rig_resolution (list[int]): Resolution of the camera. Aspect ratio is maintained.
+
+    Returns:
+        tuple(tuple(int, int)): (width, height) of each level, with heights rounded up to be
+            even.
+    """
     ratio = rig_resolution[1] / rig_resolution[0]
-    for level, width in enumerate(config.WIDTHS):
+    level_sizes = []
+    for width in config.WIDTHS:
         height = round(ratio * width)
         height += height % 2
+        level_sizes.append((width, height))
+    return tuple(level_sizes)
+
+
+@lru_cache(maxsize=64)
+def _box_tiles(src_width, src_height, width, height):
+    """Computes the source tile edges and areas of a box downsample. These only depend on
+    the sizes, so they are shared across every frame of a camera.
+
+    Args:
+        src_width (int): Width of the source image.
+        src_height (int): Height of the source image.
+        width (int): Width of the downsampled image.
+        height (int): Height of the downsampled image.
+
+    Returns:
+        tuple(np.array, np.array, np.array, np.array, np.array): Top and bottom tile edges
+            (as columns), left and right tile edges (as rows), and the tile areas.
+    """
+    xs = np.round(np.arange(width + 1) * src_width / width).astype(np.intp)
+    ys = np.round(np.arange(height + 1) * src_height / height).astype(np.intp)
+    areas = np.outer(np.diff(ys), np.diff(xs))
+    return ys[:-1, None], ys[1:, None], xs[None, :-1], xs[None, 1:], areas
+
+
+def _threshold_downsample(integral, width, height, threshold):
+    """Box downsamples a single channel 8-bit image and binary thresholds the result.
+    Each output pixel averages its source tile, which is read off the integral image with
+    four lookups rather than re-scanning the source for every level.
+
+    Args:
+        integral (np.array): Integral image of the source (as computed by cv2.integral).
+        width (int): Width of the downsampled image.
+        height (int): Height of the downsampled image.
+        threshold (int): Threshold to be used for binary thresholding.
+
+    Returns:
+        np.array: Thresholded downsampled image with values of 0 or 255.
+    """
+    src_height, src_width = integral.shape[0] - 1, integral.shape[1] - 1
+    top, bottom, left, right, areas = _box_tiles(src_width, src_height, width, height)
+    sums = (
+        integral[bottom, right]
+        - integral[top, right]
+        - integral[bottom, left]
+        + integral[top, left]
+    )
+    return np.where(np.rint(sums / areas) > threshold, 255, 0).astype(np.uint8)
+
 
-        level_name = f"level_{level}"
-        new_file = os.path.join(dst_dir, level_name, camera, frame_fn)
-        os.makedirs(os.path.dirname(new_file), exist_ok=True)
-        scaled = cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
-        if threshold is not None:
-            _, scaled = cv2.threshold(scaled, threshold, 255, cv2.THRESH_BINARY)
-        if ext == ".pfm":
-            imageio.imwrite(new_file, scaled)
+class _BufferPool:
+
+    """Pool of reusable image buffers, so resized levels do not need a fresh allocation
+    for every frame. Buffers are handed out by shape and type and must be returned once
+    they are no longer used.
+    """
+
+    def __init__(self):
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, shape, dtype):
+        """Gets a buffer, allocating one if none of the requested shape and type is free.
+
+        Args:
+            shape (tuple(int)): Shape of the buffer.
+            dtype (np.dtype): Type of the buffer.
+
+        Returns:
+            np.array: Uninitialized buffer.
+        """
+        with self._lock:
+            free = self._buffers.get((shape, np.dtype(dtype)))
+            if free:
+                return free.pop()
+        return np.empty(shape, dtype)
+
+    def release(self, buf):
+        """Returns a buffer to the pool.
+
+        Args:
+            buf (np.array): Buffer that is no longer used.
+        """
+        with self._lock:
+            self._buffers.setdefault((buf.shape, buf.dtype), []).append(buf)
+
+
+def _resize_levels(
+    img, level_sizes, threshold, use_cuda=False, use_opencl=False, buffers=None
+):
+    """Resizes an image to each of the pyramid level sizes.
+
+    Args:
+        img (np.array): Image to be resized.
+        level_sizes (tuple(tuple(int, int))): (width, height) of each level.
+        threshold (int): Threshold to be used for binary thresholding. No thresholding
+            is performed if None is passed in.
+        use_cuda (bool, optional): Whether or not to resize on the GPU.
+        use_opencl (bool, optional): Whether or not to resize through OpenCL.
+        buffers (_BufferPool, optional): Pool to take the resized images' memory from.
+
+    Returns:
+        list[np.array]: Resized image for each level.
+    """
+    # Binary masks are only ever downsampled, so their levels can all be computed from
+    # a single integral image
+    integral = None
+    if threshold is not None and img.ndim == 2 and img.dtype == np.uint8:
+        integral = cv2.integral(img)
+
+    # On the GPU the source is uploaded once and kept resident across all the levels
+    gpu_img = None
+    if use_cuda and integral is None:
+        stream = cv2.cuda_Stream()
+        gpu_img = cv2.cuda_GpuMat()
+        gpu_img.upload(img, stream)
+
+    # Transparent API: resizes on a UMat are dispatched to OpenCL when a device is present
+    umat_img = None
+    if use_opencl and integral is None and gpu_img is None:
+        umat_img = cv2.UMat(img)
+
+    levels = []
+    for width, height in level_sizes:
+        if integral is not None and width <= img.shape[1] and height <= img.shape[0]:
+            scaled = _threshold_downsample(integral, width, height, threshold)
+        elif gpu_img is not None:
+            gpu_scaled = cv2.cuda.resize(
+                gpu_img, (width, height), interpolation=cv2.INTER_AREA, stream=stream
+            )
+            scaled = gpu_scaled.download(stream)
+            stream.waitForCompletion()
+            if threshold is not None:
+                _, scaled = cv2.threshold(scaled, threshold, 255, cv2.THRESH_BINARY)
+        elif umat_img is not None:
+            scaled = cv2.resize(umat_img, (width, height), interpolation=cv2.INTER_AREA)
+            if threshold is not None:
+                _, scaled = cv2.threshold(scaled, threshold, 255, cv2.THRESH_BINARY)
+            scaled = scaled.get()
         else:
-            cv2.imwrite(new_file, scaled)
+            dst = None
+            if buffers is not None:
+                dst = buffers.acquire((height, width) + img.shape[2:], img.dtype)
+            scaled = cv2.resize(
+                img, (width, height), dst=dst, interpolation=cv2.INTER_AREA
+            )
+            if threshold is not None:
+                cv2.threshold(scaled, threshold, 255, cv2.THRESH_BINARY, dst=scaled)
+        levels.append(scaled)
+    return levels
+
+
+def _write_levels(dst_dir, camera, frame_fn, levels):
+    _, ext = os.path.splitext(frame_fn)
+    for level, scaled in enumerate(levels):
+        new_file = os.path.join(dst_dir, f"level_{level}", camera, frame_fn)
+        _write_image(new_file, scaled, ext)
 
 
-def verify_frame(src_dir, camera, frame):
-    original_file = get_frame_path(src_dir, camera, frame)
-    if not os.path.isfile(original_file):
-        raise Exception(f"Non-existent file for resize: {original_file}")
+def _run_resize_pipeline(
+    src_dir, dst_dir, jobs, threshold, num_resizers, use_cuda, use_opencl
+):
+    """Runs frames through decode, resize, and write stages. Decoding and writing are
+    I/O bound while resizing is CPU bound, so each stage has its own thread pool and a frame
+    moves on to the next pool as soon as its stage completes. OpenCV releases the GIL
+    while decoding, resizing, and encoding, so threads are sufficient.
 
+    Args:
+        src_dir (str): Path to the source directory.
+        dst_dir (str): Path to the destination directory.
+        jobs (list[tuple(str, str, tuple(tuple(int, int)))]): Camera, frame filename, and
+            level sizes of each frame to resize.
+        threshold (int): Threshold to be used for binary thresholding. No thresholding
+            is performed if None is passed in.
+        num_resizers (int): Number of threads resizing concurrently.
+        use_cuda (bool): Whether or not to resize on the GPU.
+        use_opencl (bool): Whether or not to resize through OpenCL.
+    """
+    # Bounds the number of decoded frames held in memory at once
+    max_in_flight = 2 * num_resizers
+    in_flight = threading.BoundedSemaphore(max_in_flight)
+    buffers = _BufferPool()
+    errors = []
+
+    def run_stage(stage, *args):
+        try:
+            stage(*args)
+        except Exception as e:
+            errors.append(e)
+            in_flight.release()
+
+    def decode(camera, frame_fn, level_sizes):
+        original_file = os.path.join(src_dir, camera, frame_fn)
+        img = _read_image(original_file)
+        resize_pool.submit(run_stage, resize, camera, frame_fn, img, level_sizes)
+
+    def resize(camera, frame_fn, img, level_sizes):
+        levels = _resize_levels(
+            img, level_sizes, threshold, use_cuda, use_opencl, buffers
+        )
+        write_pool.submit(run_stage, write, camera, frame_fn, levels)
+
+    def write(camera, frame_fn, levels):
+        _write_levels(dst_dir, camera, frame_fn, levels)
+        for scaled in levels:
+            buffers.release(scaled)
+        in_flight.release()
+
+    with ThreadPoolExecutor(IO_THREADS) as decode_pool, ThreadPoolExecutor(
+        num_resizers
+    ) as resize_pool, ThreadPoolExecutor(IO_THREADS) as write_pool:
+        for job in jobs:
+            in_flight.acquire()
+            if errors:
+                in_flight.release()
+                break
+            decode_pool.submit(run_stage, decode, *job)
+
+        # Frames still in flight hold a slot until they have been written
+        for _ in range(max_in_flight):
+            in_flight.acquire()
+
+    if errors:
+        raise errors[0]
 
-def resize_frames(src_dir, dst_dir, rig, first, last, threshold=None):
+
+def list_camera_frames(src_dir, camera):
+    """Lists the frames available for a camera with a single directory scan.
+
+    Args:
+        src_dir (str): Path to the source directory.
+        camera (str): Name of the camera.
+
+    Returns:
+        tuple(set[str], str): Filenames in the camera directory and the image extension.
+    """
+    camera_dir = os.path.join(src_dir, camera)
+    frame_fns = {fn for fn in os.listdir(camera_dir) if not fn.startswith(".")}
+    if len(frame_fns) == 0:
+        raise Exception(f"No files for resize in: {camera_dir}")
+    _, img_ext = os.path.splitext(min(frame_fns))
+    return frame_fns, img_ext
+
+
+def resize_frames(
+    src_dir,
+    dst_dir,
+    rig,
+    first,
+    last,
+    threshold=None,
+    use_cuda=False,
+    use_opencl=False,
+):
     """Resizes a frame to the appropriate pyramid level sizes. Files are saved in
     level_0/[camera], ..., level_9/[camera] in the destination directory.
 
@@ -103,34 +416,48 @@ def resize_frames(src_dir, dst_dir, rig, first, last, threshold=None):
         last (str): Name of the last frame to render.
         threshold (int): Threshold to be used for binary thresholding. No thresholding
             is performed if None is passed in.
+        use_cuda (bool, optional): Whether or not to resize on the GPU. Ignored if OpenCV
+            has no CUDA device available.
+        use_opencl (bool, optional): Whether or not to resize through OpenCL. Fewer resizes
+            are run concurrently, since each one is parallelized internally.
     """
-    num_workers = mp.cpu_count()
+    use_cuda = use_cuda and cuda_enabled()
+    use_opencl = use_opencl and not use_cuda
+    if use_opencl:
+        num_resizers = max(1, os.cpu_count() // OPENCL_THREADS_PER_RESIZE)
+    else:
+        num_resizers = os.cpu_count()
 
-    try:
-        mp.set_start_method(
-            "spawn", force=True
-        )  # see: https://github.com/opencv/opencv/issues/5150
-    except RuntimeError:
-        pass
-
-    pool = mp.Pool(num_workers)
-    for frame in range(int(first), int(last) + 1):
-        for camera in rig["cameras"]:
-            verify_frame(src_dir, camera["id"], get_frame_name(frame))
-            pool.apply_async(
-                resize_camera,
-                args=(
-                    src_dir,
-                    dst_dir,
-                    camera["id"],
-                    camera["resolution"],
-                    get_frame_name(frame),
-                    threshold,
-                ),
+    # Create the output directories once here rather than per frame
+    for camera in rig["cameras"]:
+        for level, _ in enumerate(config.WIDTHS):
+            os.makedirs(
+                os.path.join(dst_dir, f"level_{level}", camera["id"]), exist_ok=True
             )
 
-    pool.close()
-    pool.join()
+    # Jobs are ordered camera-major so consecutive frames share per-camera state
+    jobs = []
+    for camera in rig["cameras"]:
+        frame_fns, img_ext = list_camera_frames(src_dir, camera["id"])
+        level_sizes = get_level_sizes(camera["resolution"])
+        for frame in range(int(first), int(last) + 1):
+            frame_fn = f"{get_frame_name(frame)}{img_ext}"
+            if frame_fn not in frame_fns:
+                original_file = os.path.join(src_dir, camera["id"], frame_fn)
+                raise Exception(f"Non-existent file for resize: {original_file}")
+            jobs.append((camera["id"], frame_fn, level_sizes))
+
+    # Parallelism comes from the resize threads, so OpenCV's internal threading would only
+    # oversubscribe the CPUs. With OpenCL each resize is parallelized internally instead.
+    num_threads = cv2.getNumThreads()
+    if not use_opencl:
+        cv2.setNumThreads(1)
+    try:
+        _run_resize_pipeline(
+            src_dir, dst_dir, jobs, threshold, num_resizers, use_cuda, use_opencl
+        )
+    finally:
+        cv2.setNumThreads(num_threads)
 
 
 def main(argv):
@@ -195,6 +522,8 @@ def main(argv):
         rig,
         frames.index(FLAGS.first),
         frames.index(FLAGS.last),
+        use_cuda=FLAGS.use_cuda,
+        use_opencl=FLAGS.use_opencl,
     )
 
 
@@ -204,6 +533,8 @@ if __name__ == "__main__":
     flags.DEFINE_string("last", "", "Last frame to extract")
     flags.DEFINE_string("rig", None, "Camera rig json (to get list of cameras)")
     flags.DEFINE_string("src_dir", None, "Directory containing camera images")
+    flags.DEFINE_boolean("use_cuda", False, "Resize on the GPU if available")
+    flags.DEFINE_boolean("use_opencl", False, "Resize through OpenCL if available")
 
     # Required FLAGS.
     flags.mark_flag_as_required("rig")
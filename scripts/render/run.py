@@ -43,21 +43,23 @@ Example:
 
 Attributes:
     FLAGS (absl.flags._flagvalues.FlagValues): Globally defined flags for run.py.
+    IPC_NAMES (frozenset[str]): Names of the files used to remotely call the viewers.
+    NETWORK_FS_TYPES (frozenset[str]): Types of network filesystems. IPC directories on
+        these are polled instead of watched through native filesystem events.
 """
 
 import os
 import posixpath
+import subprocess
 import sys
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from shutil import which
 
 import colorama
-import docker
-import pyvidia
-import requests
 from absl import app, flags
-from watchdog.events import FileSystemEventHandler, DirModifiedEvent
-from watchdog.observers import Observer
+from watchdog.events import PatternMatchingEventHandler
 
 dir_scripts = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 dir_root = os.path.dirname(dir_scripts)
@@ -76,19 +78,44 @@ from scripts.util.system_util import (
     OSType,
     run_command,
 )
-from setup import RepeatedTimer, bin_to_flags, docker_mounts
+from setup import RepeatedTimer, docker_mounts, get_bin_to_flags
 
 FLAGS = flags.FLAGS
+IPC_NAMES = frozenset(config.DOCKER_IPCS)
+NETWORK_FS_TYPES = frozenset(
+    {"afpfs", "cifs", "fuse.sshfs", "ncpfs", "nfs", "nfs4", "smb3", "smbfs"}
+)
 container_name = None
 colorama.init(autoreset=True)
 
 
-class ViewerHandler(FileSystemEventHandler):
+@lru_cache(maxsize=8)
+def _read_flagfile(flagfile_fn, mtime_ns):
+    """Parses a flagfile, cached until the file is modified.
+
+    Args:
+        flagfile_fn (str): Path to the flagfile.
+        mtime_ns (int): Modification time of the flagfile, used to invalidate the cache.
+
+    Returns:
+        dict[str, str]: Map of flag names to values. Must not be modified by callers.
+    """
+    return get_flags_from_flagfile(flagfile_fn)
 
-    """Handles events triggered for displaying the viewer if called from within the UI.
+
+class ViewerHandler(PatternMatchingEventHandler):
+
+    """Handles events triggered for displaying the viewer if called from within the UI. Only
+    events on the IPC files are dispatched to the handler.
 
     Attributes:
         local_project_root (str): Path of the project on the host.
+        output_dir (str): Path of the project outputs on the host.
+        flags_dir (str): Path of the project flagfiles on the host.
+        fused_dir (str): Path of the fused outputs on the host.
+        exports_dir (str): Path of the exported outputs on the host.
+        last_mtimes (dict[str, int]): Map of IPC names to the modification time of the last
+            event handled for them.
     """
 
     def __init__(self, local_project_root):
@@ -97,19 +124,27 @@ class ViewerHandler(FileSystemEventHandler):
         Args:
             local_project_root (str): Path of the project on the host.
         """
+        super().__init__(
+            patterns=[f"*{ipc}" for ipc in IPC_NAMES], ignore_directories=True
+        )
         self.local_project_root = local_project_root
-
-    def get_fused_json(self, fused_dir):
-        for file in os.listdir(fused_dir):
-            if file.endswith("_fused.json"):
-                return file
-        return None
+        self.output_dir = posixpath.join(local_project_root, config.OUTPUT_ROOT_NAME)
+        self.flags_dir = posixpath.join(local_project_root, "flags")
+        self.fused_dir = posixpath.join(self.output_dir, image_type_paths["fused"])
+        self.exports_dir = posixpath.join(self.output_dir, image_type_paths["exports"])
+        self.last_mtimes = {}
+
+    def get_fused_json(self):
+        with os.scandir(self.fused_dir) as entries:
+            return next(
+                (entry.name for entry in entries if entry.name.endswith("_fused.json")),
+                None,
+            )
 
     def get_render_flags(self, type):
-        flags_dir = posixpath.join(self.local_project_root, "flags")
-        flagfile_fn = posixpath.join(flags_dir, f"render_{type}.flags")
-        flags_render = get_flags_from_flagfile(flagfile_fn)
-        return flags_render
+        flagfile_fn = posixpath.join(self.flags_dir, f"render_{type}.flags")
+        flags_render = _read_flagfile(flagfile_fn, os.stat(flagfile_fn).st_mtime_ns)
+        return dict(flags_render)
 
     def on_modified(self, event):
         """When a viewer file is modified from the UI, the appropriate viewer runs on the host.
@@ -117,10 +152,19 @@ class ViewerHandler(FileSystemEventHandler):
         Args:
             event (watchdog.FileSystemEvent): Watchdog event for when viewer file has been modified.
         """
-        if isinstance(event, DirModifiedEvent):
+        ipc_name = os.path.basename(event.src_path)
+        if ipc_name not in IPC_NAMES:
             return
 
-        ipc_name = os.path.basename(event.src_path)
+        # A single touch can be reported more than once, so only one event per mtime runs
+        try:
+            mtime = os.stat(event.src_path).st_mtime_ns
+        except FileNotFoundError:
+            return
+        if self.last_mtimes.get(ipc_name) == mtime:
+            return
+        self.last_mtimes[ipc_name] = mtime
+
         host_os = get_os_type(config.LOCALHOST)
         if ipc_name == config.DOCKER_RIFT_VIEWER_IPC and host_os != OSType.WINDOWS:
             print(glog.yellow("RiftViewer is only supported on Windows!"))
@@ -132,37 +176,31 @@ class ViewerHandler(FileSystemEventHandler):
             return
 
         try:
-            output_dir = posixpath.join(
-                self.local_project_root, config.OUTPUT_ROOT_NAME
-            )
             if ipc_name == config.DOCKER_RIFT_VIEWER_IPC:
-                fused_dir = posixpath.join(output_dir, image_type_paths["fused"])
-                fused_json = self.get_fused_json(fused_dir)
+                fused_dir = self.fused_dir
+                fused_json = self.get_fused_json()
                 if not fused_json:
                     print(glog.red(f"Cannot find fused rig json in {fused_dir}"))
                     return
-                cmd_flags = f"""--rig={posixpath.join(fused_dir, fused_json)} \
-                    --catalog={posixpath.join(fused_dir, "fused.json")} \
-                    --strip_files={posixpath.join(fused_dir, "fused_0.bin")}"""
+                cmd_flags = (
+                    f"--rig={fused_dir}/{fused_json} "
+                    f"--catalog={fused_dir}/fused.json "
+                    f"--strip_files={fused_dir}/fused_0.bin"
+                )
             elif ipc_name in [config.DOCKER_SMR_IPC, config.DOCKER_SMR_ONSCREEN_IPC]:
                 flags_render = self.get_render_flags("export")
 
                 if ipc_name == config.DOCKER_SMR_IPC:
-                    flags_render["output"] = posixpath.join(
-                        output_dir, image_type_paths["exports"]
-                    )
-                flags_smr = [flag["name"] for flag in bin_to_flags[app_name]]
-
-                cmd_flags = ""
-                ignore_onscreen = ["format", "output"]
-                for flag in flags_render:
-                    if flag in flags_smr:
-                        if (
-                            flag in ignore_onscreen
-                            and ipc_name == config.DOCKER_SMR_ONSCREEN_IPC
-                        ):
-                            continue
-                        cmd_flags += f" --{flag}={flags_render[flag]}"
+                    flags_render["output"] = self.exports_dir
+                flags_smr = {flag["name"] for flag in get_bin_to_flags()[app_name]}
+                if ipc_name == config.DOCKER_SMR_ONSCREEN_IPC:
+                    flags_smr -= {"format", "output"}
+
+                cmd_flags = " ".join(
+                    f"--{flag}={flags_render[flag]}"
+                    for flag in flags_render
+                    if flag in flags_smr
+                )
                 cmd_flags = cmd_flags.replace(
                     config.DOCKER_INPUT_ROOT, self.local_project_root
                 )
@@ -181,6 +219,8 @@ def start_registry(client):
     Args:
         client (DockerClient): Docker client configured to the host environment.
     """
+    import docker
+
     try:
         client.containers.run(
             "registry:2",
@@ -203,6 +243,8 @@ def build(client, docker_img):
     Raises:
         Exception: If Docker encounters an issue during the build.
     """
+    import requests
+
     try:
         print(glog.green("Preparing context"), end="")
         loading_context = RepeatedTimer(1, lambda: print(glog.green("."), end=""))
@@ -231,6 +273,30 @@ def build(client, docker_img):
         print("")  # force newline
 
 
+def build_buildkit(docker_img):
+    """Builds the Docker image with BuildKit, reusing the layers cached in the pushed image.
+
+    Args:
+        docker_img (str): Name of the Docker image.
+
+    Raises:
+        Exception: If the BuildKit build fails.
+    """
+    print(glog.green("Building Docker image with BuildKit"))
+    os.environ["DOCKER_BUILDKIT"] = "1"
+    context = os.path.dirname(os.path.abspath(FLAGS.dockerfile))
+    try:
+        run_command(
+            f"docker buildx build --load --cache-from {docker_img} "
+            f"--cache-to type=inline -t {docker_img} -f {FLAGS.dockerfile} {context}",
+            run_silently=not FLAGS.verbose,
+        )
+    except subprocess.CalledProcessError:
+        raise Exception(
+            "Docker build failed! Rerun with --verbose for details"
+        ) from None
+
+
 def push(client, docker_img):
     """Pushes the Docker image to the local registry.
 
@@ -241,58 +307,121 @@ def push(client, docker_img):
     Raises:
         Exception: If Docker encounters an issue during the push.
     """
+    # Progress is only shown in verbose mode, otherwise only status changes per layer
+    last_status = {}
     for line in client.api.push(docker_img, stream=True, decode=True):
         if "status" in line:
             if "progress" in line:
-                print(f"{line['status']}: {line['progress']}")
-            else:
+                if FLAGS.verbose:
+                    print(f"{line['status']}: {line['progress']}")
+            elif last_status.get(line.get("id")) != line["status"]:
+                last_status[line.get("id")] = line["status"]
                 print(line["status"])
         if "error" in line:
             raise Exception(line["error"])
 
 
-def create_viewer_watchdog(client, ipc_dir, local_project_root):
+def touch(path):
+    """Creates an empty file or updates the modification time of an existing one.
+
+    Args:
+        path (str): Path to the file.
+    """
+    with open(path, "a"):
+        pass
+    os.utime(path, None)
+
+
+def tail_logs(container):
+    """Prints the logs of a container as they are produced until it exits.
+
+    Args:
+        container (Container): Docker container whose logs are printed.
+    """
+    for line in container.logs(stream=True, follow=True):
+        print(line.decode("utf8").strip())
+
+
+def _is_network_mount(path):
+    """Checks whether a path lives on a network filesystem mounted on the host. Mounts
+    are only listed on Linux (through /proc/mounts), so paths on other hosts are assumed
+    to be local.
+
+    Args:
+        path (str): Path on the host.
+
+    Returns:
+        bool: Whether or not the path is on a network filesystem.
+    """
+    try:
+        with open("/proc/mounts") as f:
+            mounts = [line.split()[1:3] for line in f]
+    except OSError:
+        return False
+
+    # Spaces in mount points are escaped, and later mounts shadow earlier ones
+    mount_to_fs_type = {
+        mount_point.replace("\\040", " "): fs_type for mount_point, fs_type in mounts
+    }
+    mount_point = os.path.realpath(path)
+    while not os.path.ismount(mount_point):
+        mount_point = os.path.dirname(mount_point)
+    return mount_to_fs_type.get(mount_point) in NETWORK_FS_TYPES
+
+
+def create_viewer_watchdog(client, ipc_dir, local_project_root, use_polling=False):
     """Sets up the Watchdog to monitor the files used to remotely call the viewers.
 
     Args:
         client (DockerClient): Docker client configured to the host environment.
         ipc_dir (str): Directory where the files used to signal to the Watchdog reside.
         local_project_root (str): Path of the project on the host.
+        use_polling (bool, optional): Whether or not to poll the IPC directory every
+            --ipc_poll_interval seconds instead of relying on native filesystem events.
     """
-    for ipc in config.DOCKER_IPCS:
-        ipc_callsite = os.path.join(local_project_root, config.IPC_ROOT_NAME, ipc)
-        with open(ipc_callsite, "w"):
-            os.utime(ipc_callsite, None)
+    # Touches are issued concurrently to overlap round-trips on network project roots
+    ipc_callsites = [
+        os.path.join(local_project_root, config.IPC_ROOT_NAME, ipc)
+        for ipc in config.DOCKER_IPCS
+    ]
+    with ThreadPoolExecutor(max_workers=len(ipc_callsites)) as executor:
+        list(executor.map(touch, ipc_callsites))
 
     event_handler = ViewerHandler(local_project_root)
-    observer = Observer()
+    if use_polling:
+        from watchdog.observers.polling import PollingObserver
+
+        observer = PollingObserver(timeout=FLAGS.ipc_poll_interval)
+    else:
+        from watchdog.observers import Observer
+
+        observer = Observer()
     observer.schedule(event_handler, path=ipc_dir, recursive=False)
     observer.start()
 
-    global container_name
+    container = client.containers.get(container_name)
+    log_thread = threading.Thread(target=tail_logs, args=(container,), daemon=True)
+    log_thread.start()
     try:
-        while True:
-            time.sleep(1)
-            container = client.containers.get(container_name)
-            if container.status == "exited":
-                observer.stop()
-                break
-            for line in container.logs(stream=True):
-                print(line.decode("utf8").strip())
+        container.wait()
     except KeyboardInterrupt:
-        container = client.containers.get(container_name)
         container.stop()
-        observer.stop()
+    observer.stop()
     observer.join()
+    log_thread.join()
 
 
-def run_ui(client, docker_img):
+def run_ui(client, docker_img, use_nvidia_runtime=False):
     """Starts the UI.
 
     Args:
         client (DockerClient): Docker client configured to the host environment.
         docker_img (str): Name of the Docker image.
+        use_nvidia_runtime (bool, optional): Whether or not to run the container with the
+            NVIDIA runtime.
     """
+    import docker
+
     if not FLAGS.verbose:
         print(glog.green("Initializing container"), end="")
         loading_context = RepeatedTimer(1, lambda: print(glog.green("."), end=""))
@@ -305,11 +434,10 @@ def run_ui(client, docker_img):
         volumes.update({"/tmp/.X11-unix": {"bind": "/tmp/.X11-unix", "mode": "ro"}})
 
     if host_os == OSType.MAC or host_os == OSType.LINUX:
-        run_command(f"xhost + {config.LOCALHOST}", run_silently=not FLAGS.verbose)
-    if host_os == OSType.LINUX:
-        run_command(
-            f"xhost + {config.DOCKER_LOCAL_HOSTNAME}", run_silently=not FLAGS.verbose
-        )
+        xhosts = [config.LOCALHOST]
+        if host_os == OSType.LINUX:
+            xhosts.append(config.DOCKER_LOCAL_HOSTNAME)
+        run_command(f"xhost + {' '.join(xhosts)}", run_silently=not FLAGS.verbose)
 
     host_to_docker_path = {FLAGS.project_root: config.DOCKER_INPUT_ROOT}
 
@@ -326,7 +454,7 @@ def run_ui(client, docker_img):
     cmds = [
         "cd scripts/ui",
         f"""python3 -u dep.py \
-        --host_os={get_os_type(config.LOCALHOST)} \
+        --host_os={host_os} \
         --local_bin={FLAGS.local_bin} \
         --master={FLAGS.master} \
         --password={FLAGS.password} \
@@ -337,8 +465,9 @@ def run_ui(client, docker_img):
         --verbose={FLAGS.verbose}""",
     ]
 
-    docker_networks = client.networks.list()
-    network_names = [docker_network.name for docker_network in docker_networks]
+    # The name filter also matches substrings, so the result still has to be checked
+    docker_networks = client.networks.list(names=[config.DOCKER_NETWORK])
+    network_names = {docker_network.name for docker_network in docker_networks}
     if config.DOCKER_NETWORK not in network_names:
         client.networks.create(config.DOCKER_NETWORK, driver="bridge")
 
@@ -391,7 +520,7 @@ def run_ui(client, docker_img):
     cmd = f'/bin/bash -c "{" && ".join(cmds)}"'
     global container_name
     display = ":0" if host_os == OSType.LINUX else "host.docker.internal:0"
-    runtime = "nvidia" if which("nvidia-docker") else ""
+    runtime = "nvidia" if use_nvidia_runtime else ""
     if host_os != OSType.LINUX:
         display = "host.docker.internal:0"
 
@@ -424,14 +553,24 @@ def run_ui(client, docker_img):
             ) from None
         raise e
     container_name = container.name
-    create_viewer_watchdog(client, ipc_dir, local_project_root)
+    use_polling = _is_network_mount(ipc_dir)
+    create_viewer_watchdog(client, ipc_dir, local_project_root, use_polling)
 
 
 def setup_local_gpu():
+    """Sets up the Docker GPU environment if the host has an NVIDIA card.
+
+    Returns:
+        bool: Whether or not the NVIDIA runtime can be used by the UI container.
+    """
+    import pyvidia
+
+    host_os = get_os_type(config.LOCALHOST)
+    has_nvidia = host_os == OSType.LINUX and pyvidia.get_nvidia_device() is not None
+
     # Check if we are using Linux and we have an NVIDIA card, and we are not rendering in AWS
     if not FLAGS.project_root.startswith("s3://"):
-        host_os = get_os_type(config.LOCALHOST)
-        if host_os == OSType.LINUX and pyvidia.get_nvidia_device() is not None:
+        if has_nvidia:
             gpu_script = os.path.join(dir_scripts, "render", "setup_gpu.sh")
             print(glog.green("Setting up GPU environment..."))
             run_command(f"/bin/bash {gpu_script}", run_silently=not FLAGS.verbose)
@@ -441,6 +580,7 @@ def setup_local_gpu():
                     "We can only access an Nvidia GPU from a Linux host. Skipping Docker GPU setup"
                 )
             )
+    return has_nvidia and which("nvidia-docker") is not None
 
 
 def main(argv):
@@ -451,6 +591,7 @@ def main(argv):
     Args:
         argv (list[str]): List of arguments (used interally by abseil).
     """
+    import docker
 
     FLAGS.cache = os.path.expanduser(FLAGS.cache)
     FLAGS.csv_path = os.path.expanduser(FLAGS.csv_path)
@@ -458,23 +599,42 @@ def main(argv):
     FLAGS.local_bin = os.path.expanduser(FLAGS.local_bin)
     FLAGS.project_root = os.path.expanduser(FLAGS.project_root)
 
-    setup_local_gpu()
     client = docker.from_env()
     docker_img = f"localhost:{config.DOCKER_REGISTRY_PORT}/{config.DOCKER_IMAGE}"
+
+    # The registry is only needed for the push, so pulling and starting it is overlapped
+    # with the GPU setup and the build
+    use_registry = not FLAGS.skip_setup and FLAGS.master != config.LOCALHOST
+    if use_registry:
+        registry_thread = threading.Thread(target=start_registry, args=(client,))
+        registry_thread.start()
+
+    use_nvidia_runtime = setup_local_gpu()
     if not FLAGS.skip_setup:
-        build(client, docker_img)
-        if FLAGS.master != config.LOCALHOST:
-            start_registry(client)
+        if FLAGS.buildkit:
+            build_buildkit(docker_img)
+        else:
+            build(client, docker_img)
+        if use_registry:
+            registry_thread.join()
             push(client, docker_img)
-    run_ui(client, docker_img)
+    run_ui(client, docker_img, use_nvidia_runtime)
 
 
 if __name__ == "__main__":
+    flags.DEFINE_boolean(
+        "buildkit", False, "Build the Docker image with BuildKit (needs docker buildx)"
+    )
     flags.DEFINE_string(
         "cache", "~/cache", "local directory where sample files are cached"
     )
     flags.DEFINE_string("csv_path", "", "path to AWS credentials CSV")
     flags.DEFINE_string("dockerfile", "Dockerfile", "Path to the Dockerfile")
+    flags.DEFINE_float(
+        "ipc_poll_interval",
+        5.0,
+        "Seconds between polls of the IPC directory when it is on a network mount",
+    )
     flags.DEFINE_string(
         "local_bin", "", "Path local binaries (needed to run GPU-based viewers)"
     )
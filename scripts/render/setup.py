@@ -11,23 +11,37 @@ farm, namely between over a single node, LAN farm, and AWS farm. It additionally
 the appropriate flags to execute render.py. setup.py cannot be run standalone.
 
 Attributes:
-    bin_to_flags (dict[str, list[dict[str, _]]]): Map from binary name to corrsponding flags.
+    bin_to_sources (dict[str, str]): Map from binary name to the source defining its flags.
+    daemon_config_regex (re.Pattern): Extracts the JSON object from the output of reading a
+        Docker daemon config.
     FLAGS (absl.flags._flagvalues.FlagValues): Globally defined flags for render.py. Note that,
         unlike all other apps, the FLAGS here do not directly relate to setup.py.
+    flags_cache_fn (str): Path of the per-user cache of flags parsed from the binary sources.
+    render_flags (list[tuple(str, str, _, str)]): Type, name, default, and description of
+        the flags render.py defines on top of those of the binaries.
+    termination_signals (tuple[signal.Signals]): Signals handled as a request to terminate.
+        Faults (SIGSEGV, SIGBUS, SIGILL, SIGFPE) are left to faulthandler.
 """
 
+import ast
 import datetime
+import faulthandler
+import io
 import json
-import multiprocessing as mp
+import math
+import operator
 import os
 import re
 import signal
 import sys
+import tempfile
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from shutil import which
 from subprocess import Popen
-from threading import Timer
+from threading import Event, Thread
 
 from absl import flags, logging
 
@@ -44,31 +58,104 @@ from scripts.util.system_util import get_flags, image_type_paths, OSType, run_co
 FLAGS = flags.FLAGS
 flag_names = set()
 child_pids = []
+_log_dir = None
+daemon_config_regex = re.compile(r"\{.*\}", re.DOTALL)
+termination_signals = (
+    signal.SIGHUP,  # terminate process: terminal line hangup
+    signal.SIGINT,  # terminate process: interrupt program
+    signal.SIGQUIT,  # create core image: quit program
+    signal.SIGTRAP,  # create core image: trace trap
+    signal.SIGSYS,  # create core image: non-existent system call invoked
+    signal.SIGPIPE,  # terminate process: write on a pipe with no reader
+    signal.SIGTERM,  # terminate process: software termination signal
+)
 
 facebook360_dep_root = str(Path(os.path.abspath(__file__)).parents[2])
 source_root = os.path.join(facebook360_dep_root, "source")
 depth_est_src = os.path.join(source_root, "depth_estimation")
-bin_to_flags = {
-    "TemporalBilateralFilter": get_flags(
-        os.path.join(depth_est_src, "TemporalBilateralFilter.cpp")
-    ),
-    "ConvertToBinary": get_flags(
-        os.path.join(source_root, "mesh_stream", "ConvertToBinary.cpp")
-    ),
-    "DerpCLI": get_flags(os.path.join(depth_est_src, "DerpCLI.cpp")),
-    "GenerateForegroundMasks": get_flags(
-        os.path.join(source_root, "render", "GenerateForegroundMasks.cpp")
-    ),
-    "LayerDisparities": get_flags(os.path.join(depth_est_src, "LayerDisparities.cpp")),
-    "SimpleMeshRenderer": get_flags(
-        os.path.join(source_root, "render", "SimpleMeshRenderer.cpp")
+flags_cache_fn = os.path.join(
+    os.path.expanduser("~"), ".cache", "facebook360_dep", "flags_cache.json"
+)
+_flags_cache = None
+
+
+def _cached_get_flags(source):
+    """Gets flags from a source file, reusing the flags cached on disk if the source has
+    not changed since they were parsed.
+
+    Args:
+        source (str): Path to the source file.
+
+    Returns:
+        list[dict[str, _]]: List of maps with keys "type", "name", "default", and "descr" for the
+            respective fields corresponding to the flag.
+    """
+    global _flags_cache
+    if _flags_cache is None:
+        try:
+            with open(flags_cache_fn) as f:
+                _flags_cache = json.load(f)
+        except Exception:
+            _flags_cache = None
+        if not isinstance(_flags_cache, dict):
+            _flags_cache = {}
+
+    stat = os.stat(source)
+    key = [stat.st_mtime_ns, stat.st_size]
+    entry = _flags_cache.get(source)
+    if (
+        isinstance(entry, dict)
+        and entry.get("key") == key
+        and isinstance(entry.get("flags"), list)
+        and all(isinstance(flag, dict) for flag in entry["flags"])
+    ):
+        return entry["flags"]
+
+    source_flags = get_flags(source)
+    _flags_cache[source] = {"key": key, "flags": source_flags}
+    tmp_fn = None
+    try:
+        cache_dir = os.path.dirname(flags_cache_fn)
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+
+        # mkstemp creates the file exclusively with mode 0600, so it cannot be hijacked
+        fd, tmp_fn = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(_flags_cache, f)
+        os.replace(tmp_fn, flags_cache_fn)
+    except OSError:
+        # The cache is only an optimization
+        if tmp_fn is not None and os.path.exists(tmp_fn):
+            os.remove(tmp_fn)
+    return source_flags
+
+
+bin_to_sources = {
+    "TemporalBilateralFilter": os.path.join(
+        depth_est_src, "TemporalBilateralFilter.cpp"
     ),
-    "UpsampleDisparity": get_flags(
-        os.path.join(depth_est_src, "UpsampleDisparity.cpp")
+    "ConvertToBinary": os.path.join(source_root, "mesh_stream", "ConvertToBinary.cpp"),
+    "DerpCLI": os.path.join(depth_est_src, "DerpCLI.cpp"),
+    "GenerateForegroundMasks": os.path.join(
+        source_root, "render", "GenerateForegroundMasks.cpp"
     ),
+    "LayerDisparities": os.path.join(depth_est_src, "LayerDisparities.cpp"),
+    "SimpleMeshRenderer": os.path.join(source_root, "render", "SimpleMeshRenderer.cpp"),
+    "UpsampleDisparity": os.path.join(depth_est_src, "UpsampleDisparity.cpp"),
 }
 
 
+@lru_cache(maxsize=1)
+def get_bin_to_flags():
+    """Gets the flags of every binary run by the render pipeline. Sources are only parsed
+    on the first call.
+
+    Returns:
+        dict[str, list[dict[str, _]]]: Map from binary name to corresponding flags.
+    """
+    return {bin: _cached_get_flags(source) for bin, source in bin_to_sources.items()}
+
+
 class RepeatedTimer(object):
 
     """Executes a provided function at periodic intervals.
@@ -90,7 +177,8 @@ class RepeatedTimer(object):
             *args: Variable length argument list.
             **kwargs: Arbitrary keyword arguments.
         """
-        self._timer = None
+        self._thread = None
+        self._stop_event = None
         self.interval = interval
         self.function = function
         self.args = args
@@ -98,22 +186,28 @@ class RepeatedTimer(object):
         self.is_running = False
         self.start()
 
-    def _run(self):
-        """Runs the function asynchronously."""
-        self.is_running = False
-        self.start()
-        self.function(*self.args, **self.kwargs)
+    def _run(self, stop_event):
+        """Runs the function at every interval until the stop event is set.
+
+        Args:
+            stop_event (threading.Event): Event signaling the end of the execution.
+        """
+        while not stop_event.wait(self.interval):
+            self.function(*self.args, **self.kwargs)
 
     def start(self):
-        """Starts the repeated execution asynchronously."""
+        """Starts the repeated execution asynchronously on a single background thread."""
         if not self.is_running:
-            self._timer = Timer(self.interval, self._run)
-            self._timer.start()
+            self._stop_event = Event()
+            self._thread = Thread(
+                target=self._run, args=(self._stop_event,), daemon=True
+            )
+            self._thread.start()
             self.is_running = True
 
     def stop(self):
         """Stops the repeated execution."""
-        self._timer.cancel()
+        self._stop_event.set()
         self.is_running = False
 
 
@@ -128,6 +222,20 @@ def init_facebook360_dep(gflags):
     setup_logging_handler(gflags.log_dir)
 
 
+@lru_cache(maxsize=256)
+def get_address(address):
+    """Gets the parsed form of an address. Addresses are parsed once and shared, so the
+    result must not be modified.
+
+    Args:
+        address (str): Full network path.
+
+    Returns:
+        Address: Parsed address.
+    """
+    return Address(address)
+
+
 # Glog wrapper doesn't see GLOG environment variables, so we need to set them manually
 # GLOG environment variables override local flags
 def set_glog_env(gflags):
@@ -138,7 +246,7 @@ def set_glog_env(gflags):
     """
     gflags.alsologtostderr = "1"
     gflags.stderrthreshold = "0"
-    output_address = Address(FLAGS.output_root)
+    output_address = get_address(FLAGS.output_root)
     if output_address.protocol != "s3":
         gflags.log_dir = os.path.join(FLAGS.output_root, "logs")
 
@@ -150,7 +258,10 @@ def setup_logging_handler(log_dir):
     Args:
         log_dir (str): Path to directory where logs should be saved.
     """
-    if log_dir:
+    # The absl log file is reopened on every call, so repeated setups are skipped
+    global _log_dir
+    if log_dir and log_dir != _log_dir:
+        _log_dir = log_dir
         os.makedirs(log_dir, exist_ok=True)
         program_name = os.path.splitext(os.path.basename(sys.argv[0]))[0]
         logging.get_absl_handler().use_absl_log_file(program_name, log_dir)
@@ -159,7 +270,9 @@ def setup_logging_handler(log_dir):
 def terminate_handler():
     """Cleans workers before terminating the program."""
     cleanup_workers()
-    logging.error("".join(traceback.format_stack()))
+    stack = io.StringIO()
+    traceback.print_stack(file=stack)
+    logging.error(stack.getvalue())
     sys.exit(0)
 
 
@@ -181,100 +294,160 @@ def setup_termination_handlers(sigterm_handler=sigterm_handler):
         sigterm_handler (func: (signal.signal, frame) -> void, optional): Function for handling
             termination signals.
     """
-    [
+    # Python handlers only run once control is back in the interpreter, which a faulting
+    # instruction never returns to, so faults are reported by faulthandler from C instead
+    faulthandler.enable()
+    for s in termination_signals:
         signal.signal(s, sigterm_handler)
-        for s in [
-            signal.SIGHUP,  # terminate process: terminal line hangup
-            signal.SIGINT,  # terminate process: interrupt program
-            signal.SIGQUIT,  # create core image: quit program
-            signal.SIGILL,  # create core image: illegal instruction
-            signal.SIGTRAP,  # create core image: trace trap
-            signal.SIGFPE,  # create core image: floating-point exception
-            signal.SIGBUS,  # create core image: bus error
-            signal.SIGSEGV,  # create core image: segmentation violation
-            signal.SIGSYS,  # create core image: non-existent system call invoked
-            signal.SIGPIPE,  # terminate process: write on a pipe with no reader
-            signal.SIGTERM,  # terminate process: software termination signal
-        ]
-    ]
 
 
-def define_flags():
-    """Defines abseil flags for render."""
-    for bin in bin_to_flags:
-        for flag in bin_to_flags[bin]:
-            if flag["name"] in flag_names:
-                continue
-            cmd = f"flags.DEFINE_{flag['type']}('{flag['name']}', {flag['default']}, '{flag['descr']}')"
-            exec(cmd)
-            flag_names.add(flag["name"])
+_arithmetic_ops = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.Mod: operator.mod,
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
 
-    flags.DEFINE_integer("chunk_size", 1, "chunk size of work distribution to workers")
-    flags.DEFINE_string("cloud", "", "cloud compute service (currently supports: aws)")
-    flags.DEFINE_string("color_type", "color", "type of color to render")
-    flags.DEFINE_string("disparity_type", "disparity", "type of disparity to render")
-    flags.DEFINE_boolean(
-        "do_temporal_filter", True, "whether to run temporal filtering"
-    )
-    flags.DEFINE_boolean(
+
+def _eval_arithmetic(node):
+    """Evaluates an arithmetic expression consisting only of numbers and the basic
+    arithmetic operators.
+
+    Args:
+        node (ast.AST): Root of the parsed expression.
+
+    Returns:
+        int | float: Value of the expression.
+
+    Raises:
+        ValueError: If the expression contains anything other than numeric constants and
+            supported operators.
+    """
+    if isinstance(node, ast.Expression):
+        return _eval_arithmetic(node.body)
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    # Python 3.7 (used in the Docker image) parses numbers as ast.Num
+    if sys.version_info < (3, 8) and isinstance(node, ast.Num):
+        if type(node.n) in (int, float):
+            return node.n
+    if isinstance(node, ast.BinOp) and type(node.op) in _arithmetic_ops:
+        left = _eval_arithmetic(node.left)
+        right = _eval_arithmetic(node.right)
+        return _arithmetic_ops[type(node.op)](left, right)
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _arithmetic_ops:
+        return _arithmetic_ops[type(node.op)](_eval_arithmetic(node.operand))
+    raise ValueError(f"Unsupported expression: {ast.dump(node)}")
+
+
+def _parse_flag_default(default):
+    """Converts the default of a flag parsed from source into a Python value.
+
+    Args:
+        default (_): Default as parsed from the source, i.e. a C++ literal or expression
+            for all types except booleans.
+
+    Returns:
+        _: Value of the default.
+    """
+    if not isinstance(default, str):
+        return default
+    try:
+        return ast.literal_eval(default)
+    except (SyntaxError, ValueError):
+        pass
+
+    # Arithmetic defaults, e.g. "2.2 / 1.8"
+    try:
+        return _eval_arithmetic(ast.parse(default, mode="eval"))
+    except (SyntaxError, ValueError, ArithmeticError):
+        return default
+
+
+render_flags = [
+    ("integer", "chunk_size", 1, "chunk size of work distribution to workers"),
+    ("string", "cloud", "", "cloud compute service (currently supports: aws)"),
+    ("string", "color_type", "color", "type of color to render"),
+    ("string", "disparity_type", "disparity", "type of disparity to render"),
+    ("boolean", "do_temporal_filter", True, "whether to run temporal filtering"),
+    (
+        "boolean",
         "do_temporal_masking",
         False,
         "use foreground masks when doing temporal filtering",
-    )
-    flags.DEFINE_boolean(
+    ),
+    (
+        "boolean",
         "force_recompute",
         False,
         "whether to recompute previously performed pipeline stages",
-    )
-    flags.DEFINE_string("master", config.LOCALHOST, "ip address of master")
-    flags.DEFINE_string(
-        "password", "", "password for NFS (only relevant for SMB mounts)"
-    )
-    flags.DEFINE_boolean("run_convert_to_binary", True, "run binary conversion")
-    flags.DEFINE_boolean("run_depth_estimation", True, "run depth estimation")
-    flags.DEFINE_boolean("run_fusion", True, "run fusion")
-    flags.DEFINE_boolean(
-        "run_generate_foreground_masks", True, "run foreground mask generation"
-    )
-    flags.DEFINE_boolean("run_precompute_resizes", True, "run resizing")
-    flags.DEFINE_boolean(
-        "run_precompute_resizes_foreground", True, "run foreground mask resizing"
-    )
-    flags.DEFINE_boolean("run_simple_mesh_renderer", True, "run simple mesh renderer")
-    flags.DEFINE_boolean("skip_setup", False, "assume workers have already been set up")
-    flags.DEFINE_string(
-        "username", "", "username for NFS (only relevant for SMB mounts)"
-    )
-    flags.DEFINE_string("workers", config.LOCALHOST, "ip addresses of workers")
-
-    flag_names.update(
-        {
-            "chunk_size",
-            "cloud",
-            "color_type",
-            "disparity_type",
-            "do_temporal_filter",
-            "do_temporal_masking",
-            "force_recompute",
-            "master",
-            "password",
-            "run_generate_foreground_masks",
-            "run_precompute_resizes",
-            "run_precompute_resizes_foreground",
-            "run_depth_estimation",
-            "run_convert_to_binary",
-            "run_fusion",
-            "run_simple_mesh_renderer",
-            "skip_setup",
-            "username",
-            "workers",
-        }
-    )
+    ),
+    (
+        "boolean",
+        "guided_chunks",
+        False,
+        "shrink chunks toward chunk_size as frames run out to balance workers",
+    ),
+    ("string", "master", config.LOCALHOST, "ip address of master"),
+    ("string", "password", "", "password for NFS (only relevant for SMB mounts)"),
+    ("boolean", "run_convert_to_binary", True, "run binary conversion"),
+    ("boolean", "run_depth_estimation", True, "run depth estimation"),
+    ("boolean", "run_fusion", True, "run fusion"),
+    (
+        "boolean",
+        "run_generate_foreground_masks",
+        True,
+        "run foreground mask generation",
+    ),
+    ("boolean", "run_precompute_resizes", True, "run resizing"),
+    (
+        "boolean",
+        "run_precompute_resizes_foreground",
+        True,
+        "run foreground mask resizing",
+    ),
+    ("boolean", "run_simple_mesh_renderer", True, "run simple mesh renderer"),
+    ("boolean", "skip_setup", False, "assume workers have already been set up"),
+    ("string", "username", "", "username for NFS (only relevant for SMB mounts)"),
+    (
+        "string",
+        "workers",
+        config.LOCALHOST,
+        "ip addresses of workers (ip[:replicas[:weight]])",
+    ),
+]
+
+
+def define_flags():
+    """Defines abseil flags for render."""
+    definers = {}
+    for bin_flags in get_bin_to_flags().values():
+        for flag in bin_flags:
+            if flag["name"] in flag_names:
+                continue
+            flag_type = flag["type"]
+            if flag_type not in definers:
+                definers[flag_type] = getattr(flags, f"DEFINE_{flag_type}")
+            definers[flag_type](
+                flag["name"], _parse_flag_default(flag["default"]), flag["descr"]
+            )
+            flag_names.add(flag["name"])
+
+    for flag_type, flag_name, default, descr in render_flags:
+        if flag_type not in definers:
+            definers[flag_type] = getattr(flags, f"DEFINE_{flag_type}")
+        definers[flag_type](flag_name, default, descr)
+        flag_names.add(flag_name)
 
 
 def log_flags():
     """Prints formatted list of flags and their values."""
-    padding = max(len(flag_name) for flag_name in flag_names)
+    if not logging.level_info():
+        return
+    padding = max(map(len, flag_names))
     sorted_flags = sorted(flag_names)
     for flag_name in sorted_flags:
         logging.info(f"{flag_name} = {FLAGS[flag_name].value}".ljust(padding))
@@ -296,32 +469,27 @@ def docker_mounts(input_root, host_to_docker_path, username, password):
     Returns:
         list[str]: List of Docker mount commands
     """
-    if Address(input_root).protocol == "smb":
+    if get_address(input_root).protocol == "smb":
         mount_creds = f"mount -t cifs -o username={username},password={password} "
         mounts = [
-            f"{mount_creds} //{Address(external_path).ip_path} {docker_path}"
+            f"{mount_creds} //{get_address(external_path).ip_path} {docker_path}"
             for external_path, docker_path in host_to_docker_path.items()
         ]
     else:
         mounts = [
-            f"--mount type=bind,source={external_path},target={docker_path} \\"
+            f"--mount type=bind,source={external_path},target={docker_path}"
             for external_path, docker_path in host_to_docker_path.items()
         ]
     return mounts
 
 
-def docker_run_cmd(ip, docker_img=config.DOCKER_IMAGE):
-    """Constructs the command to run the Docker container. The container will map all
-    the desired endpoints to the canonical structure internally.
-
-    Args:
-        ip (str): IP of the master.
-        docker_img (str, optional): Name of the docker image.
+def worker_mounts():
+    """Constructs the mounts of the worker containers. These only depend on the FLAGS, so
+    they are shared by every worker.
 
     Returns:
-        str: Command to run the configured Docker container.
+        list[str]: List of Docker mount commands.
     """
-    master = config.DOCKER_LOCALHOST if ip == config.LOCALHOST else FLAGS.master
     host_to_docker_path = {
         FLAGS.input_root: config.DOCKER_INPUT_ROOT,
         FLAGS.color: os.path.join(config.DOCKER_INPUT_ROOT, image_type_paths["color"]),
@@ -337,29 +505,48 @@ def docker_run_cmd(ip, docker_img=config.DOCKER_IMAGE):
         FLAGS.output_root: config.DOCKER_OUTPUT_ROOT,
     }
 
-    mounts = docker_mounts(
+    return docker_mounts(
         FLAGS.input_root, host_to_docker_path, FLAGS.username, FLAGS.password
     )
-    if Address(FLAGS.input_root).protocol == "smb":
+
+
+def docker_run_cmd(ip, mounts, docker_img=config.DOCKER_IMAGE):
+    """Constructs the command to run the Docker container. The container will map all
+    the desired endpoints to the canonical structure internally.
+
+    Args:
+        ip (str): IP of the master.
+        mounts (list[str]): List of Docker mount commands (see worker_mounts).
+        docker_img (str, optional): Name of the docker image.
+
+    Returns:
+        str: Command to run the configured Docker container.
+    """
+    master = config.DOCKER_LOCALHOST if ip == config.LOCALHOST else FLAGS.master
+    if get_address(FLAGS.input_root).protocol == "smb":
         return f"""docker run --privileged \
             -t -d {docker_img}:latest \
             /bin/bash -c "mkdir {config.DOCKER_INPUT_ROOT} && mkdir {config.DOCKER_OUTPUT_ROOT} && {" && ".join(
             mounts)} && python3 {config.DOCKER_SCRIPTS_ROOT}/render/worker.py --master {master}" """
 
     else:
-        mount_cmds = "\n".join(mounts)
+        mount_cmds = " ".join(mounts)
         return f"""docker run {mount_cmds} \
             -t -d {docker_img}:latest \
             python3 {config.DOCKER_SCRIPTS_ROOT}/render/worker.py --master {master}"""
 
 
-def configure_worker_daemon(ip):
-    """Configures the Docker daemon to accept HTTP connections for using the local registry.
+def configure_worker_daemon(nc):
+    """Constructs the commands that configure the Docker daemon to accept HTTP connections
+    for using the local registry.
 
     Args:
-        ip (str): IP of the worker.
+        nc (NetcatClient): Netcat client connected to the worker.
+
+    Returns:
+        list[str]: Commands to run on the worker. Empty if it is already configured.
     """
-    os_type = get_os_type(ip)
+    os_type = get_os_type(nc.hostname)
 
     os_paths = {
         OSType.MAC: "~/.docker/",
@@ -389,47 +576,52 @@ def configure_worker_daemon(ip):
     registry = f"{FLAGS.master}:{config.DOCKER_REGISTRY_PORT}"
     daemon_json = os.path.join(os_paths[os_type], config.DOCKER_DAEMON_JSON)
 
-    nc = NetcatClient(ip, config.NETCAT_PORT)
     results = nc.run([f"cat {daemon_json}"])
     try:
-        relevant_part = r"\{[^\}]*\}"  # extracts section inside braces
-        m = re.search(relevant_part, results)
-        daemon_config = json.loads(m.group(0))
-    except Exception:
+        daemon_config = json.loads(results)
+    except ValueError:
+        # Netcat output can carry other shell output around the config
+        m = daemon_config_regex.search(results)
+        try:
+            daemon_config = json.loads(m.group(0)) if m else {}
+        except ValueError:
+            daemon_config = {}
+    if not isinstance(daemon_config, dict):
         daemon_config = {}
-    if "insecure-registries" in daemon_config:
-        if registry in daemon_config["insecure-registries"]:
-            return
-    else:
-        daemon_config["insecure-registries"] = []
+    insecure_registries = set(daemon_config.get("insecure-registries", []))
+    if registry in insecure_registries:
+        return []
 
-    daemon_config["insecure-registries"].append(registry)
+    # Rewriting the list as a set also drops duplicates left by earlier setups
+    insecure_registries.add(registry)
+    daemon_config["insecure-registries"] = sorted(insecure_registries)
     new_daemon_config = json.dumps(daemon_config)
     configure_cmds = [f"echo '{new_daemon_config}' > {daemon_json}"]
     configure_cmds += os_restarts[os_type]
-    nc.run(configure_cmds)
+    return configure_cmds
 
 
-def spawn_worker(ip, num_containers, run_async):
+def spawn_worker(ip, num_containers, run_async, mounts):
     """Creates worker container(s) on the desired IP.
 
     Args:
         ip (str): IP of the machine to run the worker container.
         num_containers (int): Number of containers to be run.
         run_async (bool): Whether the spawning should happen synchronously or not.
+        mounts (list[str]): List of Docker mount commands (see worker_mounts).
     """
     print(f"Spawning worker on: {ip}...")
 
     remote_image = f"{FLAGS.master}:{config.DOCKER_REGISTRY_PORT}/{config.DOCKER_IMAGE}"
-    configure_worker_daemon(ip)
-    cmds = ["docker stop $(docker ps -a -q)", f"docker pull {remote_image}"]
-    cmds += [docker_run_cmd(ip, remote_image)] * num_containers
-
     nc = NetcatClient(ip, config.NETCAT_PORT)
 
+    # Daemon configuration, GPU setup and the containers all go out in a single batch
+    cmds = configure_worker_daemon(nc)
     os_type = get_os_type(ip)
     if os_type == OSType.LINUX:
-        nc.run_script("setup_gpu.sh")
+        cmds += nc.get_script_cmds("setup_gpu.sh")
+    cmds += ["docker stop $(docker ps -a -q)", f"docker pull --quiet {remote_image}"]
+    cmds += [docker_run_cmd(ip, mounts, remote_image)] * num_containers
 
     if run_async:
         nc.run_async(cmds)
@@ -451,18 +643,33 @@ def spawn_worker_local(replica):
     )
     os.makedirs(os.path.dirname(worker_logfile), exist_ok=True)
 
-    with open(worker_logfile, "w") as fp:
-        proc = Popen(
-            [
-                "python3",
-                f"{config.DOCKER_SCRIPTS_ROOT}/render/worker.py",
-                f"--master={FLAGS.master}",
+    args = [
+        "python3",
+        f"{config.DOCKER_SCRIPTS_ROOT}/render/worker.py",
+        f"--master={FLAGS.master}",
+    ]
+
+    # posix_spawn (Python 3.8+) avoids forking the master and lets the child open its log
+    if hasattr(os, "posix_spawnp"):
+        pid = os.posix_spawnp(
+            args[0],
+            args,
+            os.environ,
+            file_actions=[
+                (
+                    os.POSIX_SPAWN_OPEN,
+                    1,
+                    worker_logfile,
+                    os.O_WRONLY | os.O_CREAT | os.O_TRUNC,
+                    0o644,
+                ),
+                (os.POSIX_SPAWN_DUP2, 1, 2),
             ],
-            stdout=fp,
-            stderr=fp,
         )
-        global child_pids
-        child_pids.append(proc.pid)
+    else:
+        with open(worker_logfile, "w") as fp:
+            pid = Popen(args, stdout=fp, stderr=fp).pid
+    child_pids.append(pid)
 
 
 def setup_master(base_params):
@@ -471,7 +678,7 @@ def setup_master(base_params):
     Args:
         base_params (dict[str, _]): Map of all the FLAGS defined in render.py.
     """
-    protocol = Address(base_params["input_root"]).protocol
+    protocol = get_address(base_params["input_root"]).protocol
     try:
         if protocol == "s3":
             run_command("sudo service rabbitmq-server start")
@@ -484,34 +691,61 @@ def setup_master(base_params):
         run_command(cmd)
 
 
-def setup_workers(base_params):
-    """Sets up the worker nodes for rendering.
+def parse_workers(workers):
+    """Parses the workers flag into hosts, their number of replicas, and their capacity.
 
     Args:
-        base_params (dict[str, _]): Map of all the FLAGS defined in render.py.
+        workers (str): Comma-separated list of worker IPs, each optionally suffixed with
+            ":[number of replicas]" and ":[relative speed of each replica]"
+            (e.g. "192.168.1.100:2:1.5,192.168.1.101").
+
+    Returns:
+        list[tuple(str, int, float)]: IP, number of replicas, and weight of each worker.
+
+    Raises:
+        Exception: If a worker has a weight that is not a positive number.
     """
-    processes = []
-    for worker in FLAGS.workers.split(","):
-        if ":" in worker:
-            ip, num_replicas = worker.split(":")
-            num_replicas = int(num_replicas)
-        else:
-            ip = worker
-            num_replicas = 1
+    parsed_workers = []
+    for worker in workers.split(","):
+        ip, *fields = worker.split(":")
+        num_replicas = int(fields[0]) if len(fields) > 0 else 1
+        weight = float(fields[1]) if len(fields) > 1 else 1.0
+        if not 0 < weight < math.inf:
+            raise Exception(f"Worker weight must be a positive number: {worker}")
+        parsed_workers.append((ip, num_replicas, weight))
+    return parsed_workers
 
-        if ip == config.LOCALHOST:
-            for replica in range(num_replicas):
-                spawn_worker_local(replica)
-        else:
-            processes.append(
-                mp.Process(target=spawn_worker, args=(ip, num_replicas, False))
-            )
 
-    for process in processes:
-        process.start()
+def setup_workers(base_params):
+    """Sets up the worker nodes for rendering.
 
-    for process in processes:
-        process.join()
+    Args:
+        base_params (dict[str, _]): Map of all the FLAGS defined in render.py.
+    """
+    # Each host is set up with a single batch of commands covering all of its replicas.
+    # Setting up a host stops its running containers, so a host listed more than once
+    # would otherwise tear down the replicas it just spawned.
+    host_replicas = {}
+    for ip, num_replicas, _ in parse_workers(FLAGS.workers):
+        host_replicas[ip] = host_replicas.get(ip, 0) + num_replicas
+
+    # Remote setups and local spawns are all I/O bound, so they share one thread pool
+    num_local_replicas = host_replicas.pop(config.LOCALHOST, 0)
+    num_tasks = len(host_replicas) + num_local_replicas
+    if num_tasks == 0:
+        return
+    mounts = worker_mounts() if host_replicas else []
+    with ThreadPoolExecutor(max_workers=min(32, num_tasks)) as executor:
+        futures = [
+            executor.submit(spawn_worker, ip, num_replicas, False, mounts)
+            for ip, num_replicas in host_replicas.items()
+        ]
+        futures += [
+            executor.submit(spawn_worker_local, replica)
+            for replica in range(num_local_replicas)
+        ]
+        for future in futures:
+            future.result()
 
 
 def cleanup_workers():
@@ -19,15 +19,25 @@ Example:
 
 Attributes:
     FLAGS (absl.flags._flagvalues.FlagValues): Globally defined flags for worker.py.
+    glog_env (dict[str, str]): Environment binaries are run with, which sends their
+        logs to stderr.
+    cleanup_pool (ThreadPoolExecutor): Pool that deletes the workspaces of finished jobs.
+    app_name_to_callback (MappingProxyType[str, func]): Read-only map from app name to
+        the callback that runs it.
 """
 
 import functools
+import glob
 import json
 import os
+import re
 import shutil
+import subprocess
 import sys
-import threading
-from copy import copy
+import tempfile
+from collections import ChainMap
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
 
 import pika
 from absl import app, flags
@@ -56,10 +66,24 @@ from network import (
 )
 from resize import resize_frames
 from scripts.render.network import Address
-from scripts.util.system_util import run_command
-from setup import bin_to_flags
+from setup import get_bin_to_flags
 
 FLAGS = flags.FLAGS
+glog_env = dict(os.environ, GLOG_alsologtostderr="1", GLOG_stderrthreshold="0")
+cleanup_pool = ThreadPoolExecutor(max_workers=1)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_app_to_flag_names():
+    """Gets the names of the flags accepted by each binary. Computed on the first call.
+
+    Returns:
+        dict[str, tuple[str]]: Map from binary name to the names of its flags.
+    """
+    return {
+        app_name: tuple(flag["name"] for flag in bin_flags)
+        for app_name, bin_flags in get_bin_to_flags().items()
+    }
 
 
 def _run_bin(msg):
@@ -67,43 +91,138 @@ def _run_bin(msg):
     running in a configured Docker container.
 
     Args:
-        msg (dict[str, str]): Message received from RabbitMQ publisher.
+        msg (Mapping[str, str]): Message received from RabbitMQ publisher, possibly
+            layered with per-callback overrides.
     """
-    msg_cp = copy(msg)
-
     # The binary flag convention includes the "last" frame
-    msg_cp["last"] = get_frame_name(int(msg["last"]))
+    msg_cp = ChainMap({"last": get_frame_name(int(msg["last"]))}, msg)
     app_name = msg_cp["app"].split(":")[0]
-    relevant_flags = [flag["name"] for flag in bin_to_flags[app_name]]
-    cmd_flags = " ".join(
-        [
-            f"--{flag}={msg_cp[flag]}"
-            for flag in relevant_flags
-            if flag in msg_cp and msg_cp[flag] != ""
-        ]
-    )
+    relevant_flags = _get_app_to_flag_names()[app_name]
+    cmd_flags = [
+        f"--{flag}={msg_cp[flag]}"
+        for flag in relevant_flags
+        if flag in msg_cp and msg_cp[flag] != ""
+    ]
 
-    # Order is determined to prevent substrings from being accidentally replaced
     input_root = msg_cp["input_root"].rstrip("/")
     output_root = msg_cp["output_root"].rstrip("/")
-
-    root_order = (
-        [output_root, input_root]
-        if input_root in output_root
-        else [input_root, output_root]
-    )
     root_to_docker = {
         input_root: config.DOCKER_INPUT_ROOT,
         output_root: config.DOCKER_OUTPUT_ROOT,
     }
 
-    for root in root_order:
-        if not os.path.exists(root):
-            cmd_flags = cmd_flags.replace(root, root_to_docker[root])
+    # Longer roots are tried first to prevent substrings from being accidentally replaced
+    missing_roots = sorted(
+        (root for root in root_to_docker if not os.path.exists(root)),
+        key=len,
+        reverse=True,
+    )
+    if missing_roots:
+        root_regex = re.compile("|".join(re.escape(root) for root in missing_roots))
+        cmd_flags = [
+            root_regex.sub(lambda match: root_to_docker[match.group(0)], cmd_flag)
+            for cmd_flag in cmd_flags
+        ]
 
+    # The binary is run directly rather than through a shell
     bin_path = os.path.join(config.DOCKER_BUILD_ROOT, "bin", app_name)
-    cmd = f"GLOG_alsologtostderr=1 GLOG_stderrthreshold=0 {bin_path} {cmd_flags}"
-    run_command(cmd)
+    argv = [bin_path] + cmd_flags
+    print(f"$ {' '.join(argv)}")
+    subprocess.run(argv, env=glog_env, check=True)
+
+
+def _run_pipelined(frames, window_size, download_frames, run_frames, upload_frames):
+    """Runs a job over consecutive windows of its frames, overlapping the transfers of
+    each window with the computation of its neighbors. The next window is downloaded
+    and the previous one uploaded while the current one is being computed. Windows are
+    not deleted once uploaded, so the job still needs disk space for all of its frames.
+
+    Args:
+        frames (list[str]): Names of the frames of the job.
+        window_size (int): Number of frames in each window.
+        download_frames (func: list[str] -> bool): Downloads the inputs of a window and
+            returns whether or not a download was performed.
+        run_frames (func: list[str] -> None): Computes the outputs of a window.
+        upload_frames (func: list[str] -> bool): Uploads the outputs of a window and
+            returns whether or not an upload was performed.
+
+    Returns:
+        tuple(bool, bool): Respectively whether or not a download and upload were performed.
+    """
+    if not frames:
+        return False, False
+
+    windows = [frames[i : i + window_size] for i in range(0, len(frames), window_size)]
+
+    ran_download = False
+    upload_futures = []
+    with ThreadPoolExecutor(max_workers=2) as transfer_executor:
+        download_future = transfer_executor.submit(download_frames, windows[0])
+        for i, window in enumerate(windows):
+            ran_download |= download_future.result()
+            if i + 1 < len(windows):
+                download_future = transfer_executor.submit(
+                    download_frames, windows[i + 1]
+                )
+            run_frames(window)
+            upload_futures.append(transfer_executor.submit(upload_frames, window))
+    ran_upload = any([upload_future.result() for upload_future in upload_futures])
+    return ran_download, ran_upload
+
+
+def _rmtree_parallel(path):
+    """Deletes a directory tree, unlinking its files from several threads at once. Errors
+    are ignored, as with shutil.rmtree(path, ignore_errors=True).
+
+    Args:
+        path (str): Path to the directory to be deleted.
+    """
+    # Directories are collected in post-order, so each is emptied before it is removed
+    dirs = []
+
+    def scan(dir_path, unlink_executor):
+        try:
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        scan(entry.path, unlink_executor)
+                    else:
+                        unlink_executor.submit(os.unlink, entry.path)
+        except OSError:
+            pass
+        dirs.append(dir_path)
+
+    with ThreadPoolExecutor(max_workers=8) as unlink_executor:
+        scan(path, unlink_executor)
+    for dir_path in dirs:
+        try:
+            os.rmdir(dir_path)
+        except OSError:
+            pass
+
+
+def _remove_root(root):
+    """Removes a directory without waiting on the deletion. The directory is moved out of
+    the way and deleted in the background, so the next job can recreate it right away.
+
+    Args:
+        root (str): Path to the directory to be removed.
+    """
+    trash_dir = tempfile.mkdtemp(prefix=".trash_", dir=config.DOCKER_ROOT)
+    try:
+        os.rename(root, os.path.join(trash_dir, os.path.basename(root)))
+    except OSError:
+        # Mount points and cross-device paths cannot be moved
+        shutil.rmtree(root)
+    cleanup_pool.submit(_rmtree_parallel, trash_dir)
+
+
+def _remove_leftover_trash():
+    """Deletes trash directories left behind by a previous worker that exited before its
+    background deletions finished.
+    """
+    for trash_dir in glob.glob(os.path.join(config.DOCKER_ROOT, ".trash_*")):
+        cleanup_pool.submit(_rmtree_parallel, trash_dir)
 
 
 def _clean_worker(ran_download, ran_upload):
@@ -113,10 +232,11 @@ def _clean_worker(ran_download, ran_upload):
         ran_download (bool): Whether or not a download was performed.
         ran_upload (bool): Whether or not an upload was performed.
     """
+    # The output root is nested in the input root, so it is removed along with it
     if ran_download and os.path.exists(config.DOCKER_INPUT_ROOT):
-        shutil.rmtree(config.DOCKER_INPUT_ROOT)
-    if ran_upload and os.path.exists(config.DOCKER_INPUT_ROOT):
-        shutil.rmtree(config.DOCKER_OUTPUT_ROOT)
+        _remove_root(config.DOCKER_INPUT_ROOT)
+    if ran_upload and os.path.exists(config.DOCKER_OUTPUT_ROOT):
+        _remove_root(config.DOCKER_OUTPUT_ROOT)
 
 
 def generate_foreground_masks_callback(msg):
@@ -134,7 +254,7 @@ def generate_foreground_masks_callback(msg):
         msg, "background_color", [msg["background_frame"]], msg["level"]
     )
 
-    msg_cp = copy(msg)
+    msg_cp = ChainMap({}, msg)
     msg_cp["color"] = local_image_type_path(msg, "color", msg["level"])
     msg_cp["background_color"] = local_image_type_path(
         msg, "background_color", msg["level"]
@@ -185,7 +305,7 @@ def depth_estimation_callback(msg):
     print("Running depth estimation...")
 
     ran_download = False
-    msg_cp = copy(msg)
+    msg_cp = ChainMap({}, msg)
     if msg["image_type"] == "disparity":
         image_types_to_level = [("color", msg["level_start"])]
         if msg["use_foreground_masks"]:
@@ -226,7 +346,7 @@ def temporal_filter_callback(msg):
     print("Running temporal filtering...")
 
     # If such frames do not exist, S3 simply does not download them
-    msg_cp = copy(msg)
+    msg_cp = ChainMap({}, msg)
     frames = get_frame_range(msg["filter_first"], msg["filter_last"])
     image_types_to_level = [("color", msg["level"]), ("disparity", msg["level"])]
     if msg["use_foreground_masks"]:
@@ -277,7 +397,7 @@ def _run_upsample(msg, run_upload=True):
     """
     image_types_to_level = [(msg["image_type"], msg["level"])]
 
-    msg_cp = copy(msg)
+    msg_cp = ChainMap({}, msg)
     if msg["image_type"] == "disparity":
         color_image_type = "color"
         image_types_to_level += [
@@ -344,7 +464,7 @@ def upsample_layer_disparity_callback(msg):
     """
     print("Running disparity upsampling and layering...")
 
-    msg_cp = copy(msg)
+    msg_cp = ChainMap({}, msg)
     msg_cp["app"] = "UpsampleDisparity"
     ran_download, _ = _run_upsample(msg, run_upload=False)
     ran_download |= download_image_type(
@@ -372,7 +492,7 @@ def convert_to_binary_callback(msg):
         msg (dict[str, str]): Message received from RabbitMQ publisher.
     """
     print("Converting to binary...")
-    msg_cp = copy(msg)
+    msg_cp = ChainMap({}, msg)
     ran_download = download_rig(msg)
 
     rig_json = os.path.basename(msg["rig"])
@@ -392,7 +512,9 @@ def convert_to_binary_callback(msg):
         ran_download |= download_image_types(msg, image_types_to_level)
 
         # If we only have color levels uploaded to S3, we fall back to level_0
-        if len(os.listdir(msg_cp["color"])) == 0:
+        with os.scandir(msg_cp["color"]) as it:
+            has_color = next(it, None) is not None
+        if not has_color:
             ran_download = download_image_types(msg, [(msg["color_type"], 0)])
             msg_cp["color"] = local_image_type_path(msg, msg["color_type"], 0)
     else:
@@ -436,30 +558,60 @@ def convert_to_binary_callback(msg):
 def simple_mesh_renderer_callback(msg):
     print("Generating exports...")
 
-    msg_cp = copy(msg)
+    msg_cp = ChainMap({}, msg)
     frames = get_frame_range(msg_cp["first"], msg_cp["last"])
-    ran_download = download_rig(msg)
+    download_rig(msg)
 
-    ran_download = download_image_type(msg, msg_cp["color_type"], frames)
-    ran_download |= download_image_type(msg, msg_cp["disparity_type"], frames)
     msg_cp["color"] = local_image_type_path(msg, msg_cp["color_type"])
     msg_cp["disparity"] = local_image_type_path(msg, msg_cp["disparity_type"])
     msg_cp["output"] = local_image_type_path(msg, msg_cp["dst_image_type"])
-    msg_cp["position"] = '"0.0 0.0 0.0"'
-    msg_cp["forward"] = '"-1.0 0.0 0.0"'
-    msg_cp["up"] = '"0.0 0.0 1.0"'
-
-    _run_bin(msg_cp)
-    ran_upload = upload_image_type(msg, msg_cp["dst_image_type"], frames)
+    msg_cp["position"] = "0.0 0.0 0.0"
+    msg_cp["forward"] = "-1.0 0.0 0.0"
+    msg_cp["up"] = "0.0 0.0 1.0"
+
+    def download_frames(window):
+        ran_download = download_image_type(msg, msg_cp["color_type"], window)
+        ran_download |= download_image_type(msg, msg_cp["disparity_type"], window)
+        return ran_download
+
+    def run_frames(window):
+        _run_bin(msg_cp.new_child({"first": window[0], "last": window[-1]}))
+
+    def upload_frames(window):
+        return upload_image_type(msg, msg_cp["dst_image_type"], window)
+
+    # Windows only pay off when there are transfers to overlap with the renders
+    is_remote = Address(msg["input_root"]).protocol == "s3"
+    window_size = FLAGS.frames_per_window if is_remote else len(frames)
+    ran_download, ran_upload = _run_pipelined(
+        frames, window_size, download_frames, run_frames, upload_frames
+    )
     _clean_worker(ran_download, ran_upload)
 
 
+app_name_to_callback = MappingProxyType(
+    {
+        "GenerateForegroundMasks": generate_foreground_masks_callback,
+        "DerpCLI": depth_estimation_callback,
+        "TemporalBilateralFilter": temporal_filter_callback,
+        "Transfer": transfer_callback,
+        "UpsampleDisparity": upsample_disparity_callback,
+        "UpsampleLayer": upsample_layer_disparity_callback,
+        "ConvertToBinary": convert_to_binary_callback,
+        "SimpleMeshRenderer": simple_mesh_renderer_callback,
+        "Resize": resize_images_callback,
+    }
+)
+
+
 def success(channel, delivery_tag):
     if channel.is_open:
         channel.basic_ack(delivery_tag)
-        channel.queue_declare(config.RESPONSE_QUEUE_NAME)
         channel.basic_publish(
-            exchange="", routing_key=config.RESPONSE_QUEUE_NAME, body="Completed!"
+            exchange="",
+            routing_key=config.RESPONSE_QUEUE_NAME,
+            body="Completed!",
+            properties=pika.BasicProperties(delivery_mode=1),  # make message transient
         )
     else:
         pass
@@ -467,8 +619,8 @@ def success(channel, delivery_tag):
 
 def failure(channel, delivery_tag, msg):
     if channel.is_open:
-        channel.basic_reject(delivery_tag)
-        channel.queue_declare(config.QUEUE_NAME)
+        # The job is republished below, so it must not also be requeued
+        channel.basic_reject(delivery_tag, requeue=False)
         channel.basic_publish(
             exchange="",
             routing_key=config.QUEUE_NAME,
@@ -480,26 +632,14 @@ def failure(channel, delivery_tag, msg):
 
 
 def handle_message(connection, channel, delivery_tag, body):
-    msg = json.loads(body.decode("utf-8"))
+    msg = json.loads(body)
     try:
         print(f"Received {msg}")
 
-        app_name_to_callback = {
-            "GenerateForegroundMasks": generate_foreground_masks_callback,
-            "DerpCLI": depth_estimation_callback,
-            "TemporalBilateralFilter": temporal_filter_callback,
-            "Transfer": transfer_callback,
-            "UpsampleDisparity": upsample_disparity_callback,
-            "UpsampleLayer": upsample_layer_disparity_callback,
-            "ConvertToBinary": convert_to_binary_callback,
-            "SimpleMeshRenderer": simple_mesh_renderer_callback,
-            "Resize": resize_images_callback,
-        }
-
-        for app_name in app_name_to_callback:
-            if msg["app"].startswith(app_name):
-                app_name_to_callback[app_name](msg)
-                break
+        # Apps are published as "<app name>" or "<app name>: <description>"
+        app_callback = app_name_to_callback.get(msg["app"].split(":", 1)[0])
+        if app_callback is not None:
+            app_callback(msg)
 
         # Sends response of job completion
         success_callback = functools.partial(success, channel, delivery_tag)
@@ -509,7 +649,7 @@ def handle_message(connection, channel, delivery_tag, body):
         connection.add_callback_threadsafe(failure_callback)
 
 
-def callback(ch, method, properties, body, connection):
+def callback(ch, method, properties, body, connection, executor):
     """Dispatches to different callbacks based on the contents of the message.
 
     Args:
@@ -519,11 +659,39 @@ def callback(ch, method, properties, body, connection):
         method (pika.spec.Basic): N/a
         properties (pika.spec.BasicProperties): N/a
         body (bytes): utf-8 encoded message published to the message queue.
+        connection (pika.BlockingConnection): Connection the message was received on.
+        executor (ThreadPoolExecutor): Pool the message is handled on, which keeps the
+            connection's I/O loop free to service heartbeats.
+    """
+    executor.submit(handle_message, connection, ch, method.delivery_tag, body)
+
+
+def connect(parameters, executor):
+    """Opens a connection to the master and subscribes to its work queue. Both queues
+    are declared here, so no further declarations are needed while the connection lasts.
+
+    Args:
+        parameters (pika.ConnectionParameters): Parameters of the master connection.
+        executor (ThreadPoolExecutor): Pool received messages are handled on.
+
+    Returns:
+        tuple(pika.BlockingConnection, pika.channel.Channel): Respectively the opened
+            connection and the channel consuming from the work queue.
     """
-    handle = threading.Thread(
-        target=handle_message, args=(connection, ch, method.delivery_tag, body)
+    connection = pika.BlockingConnection(parameters)
+    on_message_callback = functools.partial(
+        callback, connection=connection, executor=executor
+    )
+    channel = connection.channel()
+    channel.queue_declare(queue=config.QUEUE_NAME)
+    channel.queue_declare(queue=config.RESPONSE_QUEUE_NAME)
+    channel.basic_qos(prefetch_count=1)
+    channel.basic_consume(
+        queue=config.QUEUE_NAME,
+        auto_ack=False,
+        on_message_callback=on_message_callback,
     )
-    handle.start()
+    return connection, channel
 
 
 def main_loop(argv):
@@ -532,20 +700,15 @@ def main_loop(argv):
     Args:
         argv (list[str]): List of arguments (used interally by abseil).
     """
+    # Jobs share the worker's input and output roots, so they are handled one at a time
+    executor = ThreadPoolExecutor(max_workers=1)
+    parameters = pika.ConnectionParameters(
+        FLAGS.master, connection_attempts=3, retry_delay=1
+    )
+    _remove_leftover_trash()
     while True:
         try:
-            connection = pika.BlockingConnection(
-                pika.ConnectionParameters(FLAGS.master)
-            )
-            on_message_callback = functools.partial(callback, connection=(connection))
-            channel = connection.channel()
-            channel.queue_declare(queue=config.QUEUE_NAME)
-            channel.basic_qos(prefetch_count=1)
-            channel.basic_consume(
-                queue=config.QUEUE_NAME,
-                auto_ack=False,
-                on_message_callback=on_message_callback,
-            )
+            _, channel = connect(parameters, executor)
             channel.start_consuming()
         # Don't recover if connection was closed by broker
         except pika.exceptions.ConnectionClosedByBroker:
@@ -556,11 +719,17 @@ def main_loop(argv):
         # Recover on all other connection errors
         except pika.exceptions.AMQPConnectionError:
             continue
+    executor.shutdown()
 
 
 if __name__ == "__main__":
     # Abseil entry point app.run() expects all flags to be already defined
     flags.DEFINE_string("master", None, "master IP")
+    flags.DEFINE_integer(
+        "frames_per_window",
+        4,
+        "number of frames transferred and computed together in pipelined jobs",
+    )
 
     # Required FLAGS.
     flags.mark_flag_as_required("master")
@@ -28,30 +28,34 @@ Example:
           --dataset_root=s3://example/dataset
 """
 
+import importlib
 import json
 import os
-import sys
 from pathlib import Path
 
-from .test_align_colors import AlignColorsTest
-from .test_calibration import CalibrationTest
-from .test_calibration_lib_main import CalibrationLibMainTest
-from .test_convert_to_binary import ConvertToBinaryTest
-from .test_derp_cli import DerpCLITest
-from .test_export_point_cloud import ExportPointCloudTest
-from .test_generate_camera_overlaps import GenerateCameraOverlapsTest
-from .test_generate_foreground_masks import GenerateForegroundMasksTest
-from .test_import_point_cloud import ImportPointCloudTest
-from .test_layer_disparities import LayerDisparitiesTest
 from .test_master_class import generic_main, parser
-from .test_project_equirects_to_cameras import ProjectEquirectsToCamerasTest
-from .test_raw_to_rgb import RawToRgbTest
-from .test_rig_aligner import RigAlignerTest
-from .test_rig_analyzer import RigAnalyzerTest
-from .test_rig_compare import RigCompareTest
-from .test_rig_simulator import RigSimulatorTest
-from .test_simple_mesh_renderer import SimpleMeshRendererTest
-from .test_upsample_disparity import UpsampleDisparityTest
+
+# Test modules are only imported once they are selected to be run
+test_class_to_module = {
+    "AlignColorsTest": "test_align_colors",
+    "CalibrationTest": "test_calibration",
+    "CalibrationLibMainTest": "test_calibration_lib_main",
+    "ConvertToBinaryTest": "test_convert_to_binary",
+    "DerpCLITest": "test_derp_cli",
+    "ExportPointCloudTest": "test_export_point_cloud",
+    "GenerateCameraOverlapsTest": "test_generate_camera_overlaps",
+    "GenerateForegroundMasksTest": "test_generate_foreground_masks",
+    "ImportPointCloudTest": "test_import_point_cloud",
+    "LayerDisparitiesTest": "test_layer_disparities",
+    "ProjectEquirectsToCamerasTest": "test_project_equirects_to_cameras",
+    "RawToRgbTest": "test_raw_to_rgb",
+    "RigAlignerTest": "test_rig_aligner",
+    "RigAnalyzerTest": "test_rig_analyzer",
+    "RigCompareTest": "test_rig_compare",
+    "RigSimulatorTest": "test_rig_simulator",
+    "SimpleMeshRendererTest": "test_simple_mesh_renderer",
+    "UpsampleDisparityTest": "test_upsample_disparity",
+}
 
 
 try:
@@ -88,14 +92,13 @@ def get_ordered_tests(tests_setup, test_type):
                     print(dataset, output_node)
                     test_graph.add_edge(dataset, output_node, name=test_app)
 
-    ordered_nodes = list(nx.topological_sort(test_graph))
-    ordered_tests = []
-    for node in ordered_nodes:
-        for neighbor in test_graph.neighbors(node):
-            test_app = test_graph.get_edge_data(node, neighbor)["name"]
-            if test_app not in ordered_tests:
-                ordered_tests.append(test_app)
-    return ordered_tests
+    # Dict keys keep the first-seen order while deduplicating in constant time
+    ordered_tests = dict.fromkeys(
+        test_app
+        for node in nx.topological_sort(test_graph)
+        for _, _, test_app in test_graph.out_edges(node, data="name")
+    )
+    return list(ordered_tests)
 
 
 def run_tests(loader=None, res_dir=None):
@@ -133,7 +136,10 @@ def run_tests(loader=None, res_dir=None):
         ordered_tests = get_ordered_tests(tests_setup, args.type)
     test_classes = []
     for test in ordered_tests:
-        test_classes.append(getattr(sys.modules[__name__], test))
+        test_module = importlib.import_module(
+            f".{test_class_to_module[test]}", __package__
+        )
+        test_classes.append(getattr(test_module, test))
     generic_main(test_classes, loader, res_dir)
 
 
@@ -17,12 +17,25 @@ Example:
         $ python test_calibration.py \
           --binary_dir=/path/to/facebook360_dep/build/bin \
           --dataset_root=s3://example/dataset
+
+Attributes:
+    corners_regex (re.Pattern): Matches the accepted corner count of MatchCorners.
+    median_error_regex (re.Pattern): Matches the median error of a calibration pass.
+    timing_regex (re.Pattern): Matches the wall and CPU times of a boost timing report.
+    traces_regex (re.Pattern): Matches the nonempty trace count of a calibration.
 """
 
+import mmap
 import os
+import re
 
 from .test_master_class import DepTest, generic_main
 
+corners_regex = re.compile(r"cam0 accepted corners:\s*(\S+)")
+median_error_regex = re.compile(r"median\s+(\S+)")
+timing_regex = re.compile(r"(?P<wall>[\d.]+)s wall, .* = (?P<cpu>[\d.]+)s CPU")
+traces_regex = re.compile(r"found\s+(\S+)")
+
 
 class CalibrationTest(DepTest):
 
@@ -56,17 +69,20 @@ class CalibrationTest(DepTest):
                     self.io_args.color = os.path.join(self.io_args.input_root, dataset)
                     return test_setup
 
-    def _calibration_error_test(self, dataset_name, app_name):
+    def _calibration_error_test(self, dataset_name, app_name, setup=None):
         """Generic error test on a dataset configured with res/test/translator.json.
 
         Args:
             dataset_name (str): Name of the dataset.
             app_name (str): Name of the app to be tested.
+            setup (dict[str, _], optional): Test setup for the dataset. If None is passed
+                in, it is looked up from the dataset name.
 
         Raises:
             AssertionError: If incorrect results are produced.
         """
-        setup = self._get_setup(dataset_name)
+        if setup is None:
+            setup = self._get_setup(dataset_name)
         try:
             self.run_app(app_name)
         except Exception:
@@ -86,7 +102,7 @@ class CalibrationTest(DepTest):
         self.setup_flags()
         test_setup = self._get_setup(dataset_name)
         if test_setup["error_test"]:
-            self._calibration_error_test(dataset_name, "Calibration")
+            self._calibration_error_test(dataset_name, "Calibration", test_setup)
         else:
             self.run_app("Calibration")
             record = parse_calibration_results(
@@ -132,21 +148,58 @@ class CalibrationTest(DepTest):
         self._calibration_test("color_full")
 
 
-def _get_line_with_str(lines, string, index):
-    """Extracts the index-th line containing a string.
+def _find_line_with_str(mm, string, index, ignore_str=None):
+    """Extracts the first or last line of a memory-mapped file containing a string.
+
+    Args:
+        mm (mmap.mmap): Memory-mapped file to be searched.
+        string (bytes): Substring to filter lines by.
+        index (int): Which filtered line to return, either 0 (the first) or -1 (the last).
+        ignore_str (bytes, optional): Substring marking lines to be skipped entirely.
+
+    Returns:
+        str: Filtered line. None if no such line exists.
+    """
+    pos = mm.find(string) if index == 0 else mm.rfind(string)
+    while pos != -1:
+        line_start = mm.rfind(b"\n", 0, pos) + 1
+        line_end = mm.find(b"\n", pos)
+        if line_end == -1:
+            line_end = len(mm)
+        line = mm[line_start:line_end]
+        if ignore_str is None or ignore_str not in line:
+            return line.decode(errors="ignore")
+        if index == 0:
+            pos = mm.find(string, line_end)
+        else:
+            pos = mm.rfind(string, 0, line_start)
+    return None
+
+
+def _get_lines_with_strs(file_path, string_to_index, ignore_str=None):
+    """Extracts the lines of a file containing each of several strings.
 
     Args:
-        lines (list[str]): List of strings (typically lines from a file).
-        string (str): Substring to filter lines by.
-        index (int): Which filtered string to return.
+        file_path (str): Path to the file to be searched (typically a glog file).
+        string_to_index (dict[str, int]): Map of substrings to filter lines by to which
+            filtered string to return, either 0 (the first) or -1 (the last).
+        ignore_str (str, optional): Substring marking lines to be skipped entirely.
 
     Returns:
-        str: The index-th fitlered string. Returns None if no such string exists.
+        dict[str, str]: Map of substrings to their filtered strings. Substrings map to
+            None if no such string exists.
     """
-    relevant_lines = [line for line in lines if string in line]
-    if len(relevant_lines) == 0 or (index != -1 and len(relevant_lines) <= index):
-        return None
-    return relevant_lines[index]
+    if os.path.getsize(file_path) == 0:
+        return dict.fromkeys(string_to_index)
+
+    if ignore_str is not None:
+        ignore_str = ignore_str.encode()
+    with open(file_path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return {
+                string: _find_line_with_str(mm, string.encode(), index, ignore_str)
+                for string, index in string_to_index.items()
+            }
 
 
 def _get_time_split(timing_line):
@@ -159,13 +212,11 @@ def _get_time_split(timing_line):
     Returns:
         dict[str, float]: Map with keys "cpu" and "wall" for the respective readings.
     """
-    cpu_time_half = timing_line.split("CPU")[0].strip()
-    cpu_time = float(cpu_time_half.split(" ")[-1].replace("s", ""))
-
-    wall_time_half = timing_line.split("wall")[0].strip()
-    wall_time = float(wall_time_half.split(" ")[-1].replace("s", ""))
-
-    return {"cpu": cpu_time, "wall": wall_time}
+    timing_match = timing_regex.search(timing_line)
+    return {
+        "cpu": float(timing_match.group("cpu")),
+        "wall": float(timing_match.group("wall")),
+    }
 
 
 def parse_match_corners_results(log_dir, bin_name="MatchCorners", parse_timing=False):
@@ -179,26 +230,26 @@ def parse_match_corners_results(log_dir, bin_name="MatchCorners", parse_timing=F
     Returns:
         dict[str, float]: Parsed values from the MatchCorners glog file.
     """
+    features_str = "cam0 accepted corners:"
+    param_to_timing_str = {
+        "match_corners": "Matching stage time",
+        "find_corners": "Find corners stage time",
+    }
+    string_to_index = {features_str: 0}
+    if parse_timing:
+        string_to_index.update(dict.fromkeys(param_to_timing_str.values(), 0))
+
     info_path = os.path.join(log_dir, f"{bin_name}.INFO")
-    with open(info_path, "r") as f:
-        lines = f.readlines()
+    string_to_line = _get_lines_with_strs(info_path, string_to_index)
 
     records = {}
 
-    features_str = "cam0 accepted corners:"
-    features_line = _get_line_with_str(lines, features_str, 0)
-    features_half = features_line.split(features_str)[1].strip()
-    records["match_corners_count"] = int(features_half.split(" ")[0])
+    features_line = string_to_line[features_str]
+    records["match_corners_count"] = int(corners_regex.search(features_line).group(1))
 
     if parse_timing:
-        param_to_timing_str = {
-            "match_corners": "Matching stage time",
-            "find_corners": "Find corners stage time",
-        }
-
         for param in param_to_timing_str:
-            timing_str = param_to_timing_str[param]
-            timing_line = _get_line_with_str(lines, timing_str, 0)
+            timing_line = string_to_line[param_to_timing_str[param]]
             times = _get_time_split(timing_line)
             records[f"{param}_cpu_time"] = times["cpu"]
             records[f"{param}_wall_time"] = times["wall"]
@@ -218,28 +269,30 @@ def parse_calibration_results(
     Returns:
         dict[str, float]: Parsed values from the GeometricCalibration glog file.
     """
+    traces_str = "nonempty traces"
+    error_str = "median"
+    timing_str = "Aggregate timing"
+    string_to_index = {traces_str: 0, error_str: -1}
+    if parse_timing:
+        string_to_index[timing_str] = 0
+
     info_path = os.path.join(log_dir, f"{bin_name}.INFO")
-    with open(info_path, "r") as f:
-        lines = f.readlines()
-        for line in lines:
-            if "Warning" in line:
-                lines.remove(line)
+    # Warnings can mention the same strings as the results (e.g. "median")
+    string_to_line = _get_lines_with_strs(
+        info_path, string_to_index, ignore_str="Warning"
+    )
 
     records = {}
 
-    traces_str = "nonempty traces"
-    traces_line = _get_line_with_str(lines, traces_str, 0)
-    traces_half = traces_line.split("found ")[1].strip()
-    records["calibration_trace_count"] = int(traces_half.split(" ")[0])
+    traces_line = string_to_line[traces_str]
+    records["calibration_trace_count"] = int(traces_regex.search(traces_line).group(1))
 
-    error_str = "median"
-    error_line = _get_line_with_str(lines, error_str, -1)
-    error_half = error_line.split(error_str)[1].strip()
-    records["calibration_median_error"] = float(error_half.split(" ")[0])
+    error_line = string_to_line[error_str]
+    error_match = median_error_regex.search(error_line)
+    records["calibration_median_error"] = float(error_match.group(1))
 
     if parse_timing:
-        timing_str = "Aggregate timing"
-        timing_line = _get_line_with_str(lines, timing_str, 0)
+        timing_line = string_to_line[timing_str]
         times = _get_time_split(timing_line)
         records["calibration_cpu_time"] = (times["cpu"],)
         records["calibration_wall_time"] = times["wall"]
@@ -46,11 +46,21 @@ class CalibrationLibMainTest(DepTest):
         # CalibrationLibMain assumes the operating frame to be 000000
         lib_main_input = self.io_args.color_full + "_000000"
         if not os.path.exists(lib_main_input):
-            shutil.copytree(self.io_args.color_full, lib_main_input)
-            for cam in os.listdir(lib_main_input):
-                cur_img = os.path.join(lib_main_input, cam, f"{self.io_args.first}.png")
-                new_img = os.path.join(lib_main_input, cam, "000000.png")
-                os.rename(cur_img, new_img)
+            # Frames are hard linked rather than copied, since they are only read
+            try:
+                shutil.copytree(
+                    self.io_args.color_full, lib_main_input, copy_function=os.link
+                )
+            except (OSError, shutil.Error):
+                shutil.rmtree(lib_main_input, ignore_errors=True)
+                shutil.copytree(self.io_args.color_full, lib_main_input)
+            first_img = f"{self.io_args.first}.png"
+            with os.scandir(lib_main_input) as it:
+                for cam in it:
+                    if cam.is_dir():
+                        cur_img = os.path.join(cam.path, first_img)
+                        new_img = os.path.join(cam.path, "000000.png")
+                        os.rename(cur_img, new_img)
 
         self.run_app(
             "CalibrationLibMain",
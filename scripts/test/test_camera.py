@@ -12,6 +12,7 @@ Example:
         $ python test_camera.py
 """
 
+import copy
 import os
 import sys
 import unittest
@@ -32,22 +33,32 @@ from rig import Rig
 
 
 class cameraTest(unittest.TestCase):
-    def setUp(self):
+    @classmethod
+    def setUpClass(cls):
         rig_file = dir_root + "/res/test/rigs/rig.json"
         ftheta_file = dir_root + "/res/test/cameras/ftheta.json"
         rect_file = dir_root + "/res/test/cameras/rectilinear.json"
         orth_file = dir_root + "/res/test/cameras/orthographic.json"
 
-        self.rig = Rig(rig_file)
+        cls.loaded_rig = Rig(rig_file)
+        cls.loaded_rig.cameras.append(Camera(ftheta_file))
+        cls.loaded_rig.cameras.append(Camera(rect_file))
+        cls.loaded_rig.cameras.append(Camera(orth_file))
+        cls.loaded_camera_testers = [
+            CameraTester(camera) for camera in cls.loaded_rig.cameras
+        ]
+
+    def setUp(self):
+        # Tests modify the cameras in place, so each one works on its own copy. The rig
+        # and testers are copied together, so each tester refers to the copied camera
+        self.rig, self.camera_testers = copy.deepcopy(
+            (self.loaded_rig, self.loaded_camera_testers)
+        )
         self.cameras = self.rig.cameras
-        self.cameras.append(Camera(ftheta_file))
-        self.cameras.append(Camera(rect_file))
-        self.cameras.append(Camera(orth_file))
 
     def test_projection_in_fov(self):
         # Case 1: test using a direction inside the fov of each camera
-        for camera in self.cameras:
-            ct = CameraTester(camera)
+        for camera, ct in zip(self.cameras, self.camera_testers):
             direction = camera.forward()
             depth = 1.23
             test_output = ct.test_projection(direction, depth)
@@ -57,8 +68,7 @@ class cameraTest(unittest.TestCase):
 
     def test_projection_out_fov(self):
         # Case 2: test using a direction outside the fov of each camera
-        for camera in self.cameras:
-            ct = CameraTester(camera)
+        for camera, ct in zip(self.cameras, self.camera_testers):
             direction = camera.backward()
             depth = 4.2
             test_output = ct.test_projection(direction, depth)
@@ -68,10 +78,9 @@ class cameraTest(unittest.TestCase):
 
     def test_projection_fixed(self):
         # Case 3: test using a fixed direction for all cameras in rig
-        for camera in self.cameras:
-            ct = CameraTester(camera)
-            direction = np.array([-2, 3, -1])
-            depth = 3.1
+        direction = np.array([-2, 3, -1])
+        depth = 3.1
+        for camera, ct in zip(self.cameras, self.camera_testers):
             test_output = ct.test_projection(direction, depth)
             self.assertTrue(
                 test_output.result, "{}: {}".format(camera.id, test_output.message)
@@ -79,8 +88,7 @@ class cameraTest(unittest.TestCase):
 
     def test_sees_in_fov(self):
         # Case 1: test using point inside the fov and sensor
-        for camera in self.cameras:
-            ct = CameraTester(camera)
+        for camera, ct in zip(self.cameras, self.camera_testers):
             pixel = camera.principal
             point = camera.point_near_infinity(pixel)
             test_output = ct.test_fov_with_point(point)
@@ -90,8 +98,7 @@ class cameraTest(unittest.TestCase):
 
     def test_sees_out_fov(self):
         # Case 2: test using point outside the fov
-        for camera in self.cameras:
-            ct = CameraTester(camera)
+        for camera, ct in zip(self.cameras, self.camera_testers):
             point = camera.backward()
             test_output = ct.test_fov_with_point(point)
             self.assertFalse(
@@ -100,18 +107,16 @@ class cameraTest(unittest.TestCase):
 
     def test_sees_out_sensor(self):
         # Case 3: test using point outside the sensor
-        for camera in self.cameras:
-            ct = CameraTester(camera)
-            pixel = np.array([-1, -1])
+        pixel = np.array([-1, -1])
+        for camera, ct in zip(self.cameras, self.camera_testers):
             test_output = ct.test_fov_with_pixel(pixel)
             self.assertFalse(
                 test_output.result, "{}: {}".format(camera.id, test_output.message)
             )
 
     def test_rotation(self):
-        for camera in self.cameras:
-            ct = CameraTester(camera)
-            rotation_matrix = np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1]])
+        rotation_matrix = np.array([[1, 0, 0], [0, 1, 0], [0, 0, 1]])
+        for camera, ct in zip(self.cameras, self.camera_testers):
             test_output = ct.test_rotation(rotation_matrix)
             self.assertTrue(
                 test_output.result, "{}: {}".format(camera.id, test_output.message)
@@ -119,10 +124,9 @@ class cameraTest(unittest.TestCase):
 
     def test_distort_positive_real(self):
         # Case 1: positive real roots
-        for camera in self.cameras:
-            ct = CameraTester(camera)
-            distortion = np.array([0.2, 0.02, 0])
-            radial_position = 2
+        distortion = np.array([0.2, 0.02, 0])
+        radial_position = 2
+        for camera, ct in zip(self.cameras, self.camera_testers):
             test_output = ct.test_distort_undistort(distortion, radial_position)
             self.assertTrue(
                 test_output.result, "{}: {}".format(camera.id, test_output.message)
@@ -130,10 +134,9 @@ class cameraTest(unittest.TestCase):
 
     def test_distort_negative_real(self):
         # Case 2: negative real roots
-        for camera in self.cameras:
-            ct = CameraTester(camera)
-            distortion = np.array([2 / 3, 1 / 5, 0])
-            radial_position = 2
+        distortion = np.array([2 / 3, 1 / 5, 0])
+        radial_position = 2
+        for camera, ct in zip(self.cameras, self.camera_testers):
             test_output = ct.test_distort_undistort(distortion, radial_position)
             self.assertFalse(
                 test_output.result, "{}: {}".format(camera.id, test_output.message)
@@ -141,10 +144,9 @@ class cameraTest(unittest.TestCase):
 
     def test_distort_imaginary(self):
         # Case 3: imaginary roots
-        for camera in self.cameras:
-            ct = CameraTester(camera)
-            distortion = np.array([1, 1, 0])
-            radial_position = 2
+        distortion = np.array([1, 1, 0])
+        radial_position = 2
+        for camera, ct in zip(self.cameras, self.camera_testers):
             test_output = ct.test_distort_undistort(distortion, radial_position)
             self.assertFalse(
                 test_output.result, "{}: {}".format(camera.id, test_output.message)
@@ -152,10 +154,9 @@ class cameraTest(unittest.TestCase):
 
     def test_distort_no_op(self):
         # Case 4: no-op (default distortion)
-        for camera in self.cameras:
-            ct = CameraTester(camera)
-            distortion = np.array([0, 0, 0])
-            radial_position = 3
+        distortion = np.array([0, 0, 0])
+        radial_position = 3
+        for camera, ct in zip(self.cameras, self.camera_testers):
             test_output = ct.test_distort_undistort(distortion, radial_position)
             self.assertTrue(
                 test_output.result, "{}: {}".format(camera.id, test_output.message)
@@ -163,9 +164,8 @@ class cameraTest(unittest.TestCase):
 
     def test_distort_monotonic(self):
         # Case 5: monotonic (check that distortion value is non-decreasing)
-        for camera in self.cameras:
-            ct = CameraTester(camera)
-            distortion = np.array([-0.03658484692522479, -0.004515457470690702, 0])
+        distortion = np.array([-0.03658484692522479, -0.004515457470690702, 0])
+        for camera, ct in zip(self.cameras, self.camera_testers):
             test_output = ct.test_distort_monotonic(distortion)
             self.assertTrue(
                 test_output.result, "{}: {}".format(camera.id, test_output.message)
@@ -173,8 +173,7 @@ class cameraTest(unittest.TestCase):
 
     def test_rescale_small(self):
         # Case 1: snall scale factor
-        for camera in self.cameras:
-            ct = CameraTester(camera)
+        for camera, ct in zip(self.cameras, self.camera_testers):
             test_output = ct.test_rescale(0.0012)
             self.assertTrue(
                 test_output.result, "{}: {}".format(camera.id, test_output.message)
@@ -182,8 +181,7 @@ class cameraTest(unittest.TestCase):
 
     def test_rescale_large(self):
         # Case 2: large scale factor
-        for camera in self.cameras:
-            ct = CameraTester(camera)
+        for camera, ct in zip(self.cameras, self.camera_testers):
             test_output = ct.test_rescale(99999.9)
             self.assertTrue(
                 test_output.result, "{}: {}".format(camera.id, test_output.message)
@@ -191,8 +189,7 @@ class cameraTest(unittest.TestCase):
 
     def test_normalize_camera(self):
         # Case 1: normalize each individual camera
-        for camera in self.cameras:
-            ct = CameraTester(camera)
+        for camera, ct in zip(self.cameras, self.camera_testers):
             test_output = ct.test_normalize()
             self.assertTrue(
                 test_output.result, "{}: {}".format(camera.id, test_output.message)
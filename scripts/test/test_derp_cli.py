@@ -17,9 +17,15 @@ Example:
         $ python test_derp_cli.py \
           --binary_dir=/path/to/facebook360_dep/build/bin \
           --dataset_root=s3://example/dataset
+
+Attributes:
+    rephoto_error_regex (re.Pattern): Pattern capturing the red, green, and blue
+        rephotography errors from the final ComputeRephotographyErrors log line.
 """
 
+import mmap
 import os
+import re
 import sys
 
 sys.path.append(
@@ -28,6 +34,10 @@ sys.path.append(
 from . import test_config as config
 from .test_master_class import DepTest, generic_main
 
+rephoto_error_regex = re.compile(
+    r"R\s+(?P<error_r>\S+)%,\s*G\s+(?P<error_g>\S+)%,\s*B\s+(?P<error_b>\S+)%"
+)
+
 
 class DerpCLITest(DepTest):
 
@@ -48,17 +58,15 @@ class DerpCLITest(DepTest):
                 the keys "error_r", "error_g", and "error_b."
         """
         info_path = os.path.join(log_dir, "ComputeRephotographyErrors.INFO")
-        with open(info_path, "r") as f:
-            lines = f.readlines()
+        with open(info_path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                line_start = mm.rfind(b"\n", 0, len(mm) - 1) + 1
+                rephoto_error_line = mm[line_start:].decode(errors="ignore")
 
         # rephoto_error_line here refers to line specifically in the format:
         # <timestamp> ComputeRephotographyErrors.cpp:<line_number> TOTAL average MSSIM: R <error_r>%, G <error_g>%, B <error_b>%
-        rephoto_error_line = lines[-1]
-        parts = rephoto_error_line.split("%")
-        parts = [float(parts[i].split(" ")[-1]) for i in range(3)]  # returns R, G, B
-        part_labels = ["error_r", "error_g", "error_b"]
-
-        errors = dict(zip(part_labels, parts))
+        match = rephoto_error_regex.search(rephoto_error_line)
+        errors = {k: float(v) for k, v in match.groupdict().items()}
         return errors
 
     def test_run(self):
@@ -26,8 +26,11 @@ Example:
 
 """
 
+import glob
 import os
+import shutil
 import sys
+import urllib.request
 
 dir_scripts = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 dir_root = os.path.dirname(dir_scripts)
@@ -42,11 +45,14 @@ class Loader:
     """Loader for downloading and preparing datasets available at public endpoints.
 
     Attributes:
+        cache_dir (str): Directory where downloaded objects are kept across runs, keyed
+            by their ETag. If None, objects are only reused from the current directory.
         endpoint_map (dict[str, func : str -> str): Map of endpoint type to a function
             that downloads URLs of said type. Functions should return the local path.
     """
 
-    def __init__(self):
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
         self.endpoint_map = {"s3": self._download_s3}
 
     def download(self, dataset_root, dataset, local):
@@ -72,12 +78,61 @@ class Loader:
         Returns:
             str: Local path to where the object pointed to by the URL was downloaded.
         """
-        if os.path.exists(os.path.basename(url)):
+        if self.cache_dir is None and os.path.exists(os.path.basename(url)):
             return None
 
         import wget
 
         bucket_name, remote_path = url.split("/", 1)
         public_s3_url = f"http://{bucket_name}.s3.amazonaws.com/{remote_path}"
-        local_path = wget.download(public_s3_url)
+        if self.cache_dir is None:
+            return wget.download(public_s3_url)
+
+        local_path = os.path.basename(remote_path)
+        cached_path = self._get_cached_path(public_s3_url, local_path)
+        if cached_path is None:
+            if os.path.exists(local_path):
+                return None
+            return wget.download(public_s3_url)
+
+        if not os.path.exists(cached_path):
+            os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+            partial_path = f"{cached_path}.part"
+            try:
+                wget.download(public_s3_url, out=partial_path)
+                os.replace(partial_path, cached_path)
+            finally:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+
+        if os.path.exists(local_path):
+            os.remove(local_path)
+        try:
+            os.link(cached_path, local_path)
+        except OSError:
+            shutil.copyfile(cached_path, local_path)
         return local_path
+
+    def _get_cached_path(self, url, filename):
+        """Gets the path in the cache for the current version of a remote object. If the
+        object cannot be reached, the most recently cached copy is used instead.
+
+        Args:
+            url (str): HTTP URL of the object.
+            filename (str): Name of the file to be saved in the cache.
+
+        Returns:
+            str: Path to the cached copy of the object, which may not yet exist. None if
+                the object version is unknown and there is no copy to fall back to.
+        """
+        request = urllib.request.Request(url, method="HEAD")
+        try:
+            with urllib.request.urlopen(request) as response:
+                etag = response.headers.get("ETag")
+        except OSError:
+            cached_paths = glob.glob(os.path.join(self.cache_dir, "*", filename))
+            return max(cached_paths, key=os.path.getmtime, default=None)
+
+        if not etag:
+            return None
+        return os.path.join(self.cache_dir, etag.strip('"'), filename)
@@ -42,6 +42,10 @@ parser.add_argument(
     help="Endpoint to root directory where *.tar data files are hosted",
     required=True,
 )
+parser.add_argument(
+    "--cache_dir",
+    help="Optional directory where downloaded *.tar data files are cached across runs",
+)
 
 
 def listdir_nohidden(path):
@@ -428,11 +432,12 @@ def generic_main(test_classes, loader=None, res_dir=None):
         tests_setup = json.load(f)
 
     if loader is None:
-        loader = test_io.Loader()
+        loader = test_io.Loader(args.cache_dir)
 
     testing_dir = "tmp"
     truth_dir = os.path.join(testing_dir, "truth")
     test_suites = []
+    prepared = set()
     for test_class in test_classes:
         test_datasets = set()
         test_truths = set()
@@ -449,11 +454,15 @@ def generic_main(test_classes, loader=None, res_dir=None):
                 )
             else:
                 dst = testing_dir
-            loader.download(args.dataset_root, dataset, dst)
+            if (dataset, dst) not in prepared:
+                loader.download(args.dataset_root, dataset, dst)
+                prepared.add((dataset, dst))
 
         for truth in test_truths:
             print(f"Preparing truth: {truth}...")
-            loader.download(args.dataset_root, truth, truth_dir)
+            if (truth, truth_dir) not in prepared:
+                loader.download(args.dataset_root, truth, truth_dir)
+                prepared.add((truth, truth_dir))
 
         prepare_run(test_class, testing_dir, test_setup["rig"], args.binary_dir)
 
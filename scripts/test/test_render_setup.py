@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# Copyright 2004-present Facebook. All Rights Reserved.
+
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""Render setup unit tests
+
+Runs unit tests on the parsing of flag defaults taken from the binary sources
+
+Example:
+        $ python test_render_setup.py
+"""
+
+import os
+import sys
+import unittest
+
+dir_scripts = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+dir_root = os.path.dirname(dir_scripts)
+
+sys.path.append(dir_root)
+sys.path.append(os.path.join(dir_scripts, "render"))
+
+from setup import _parse_flag_default
+
+
+class renderSetupTest(unittest.TestCase):
+    def test_literal_defaults(self):
+        self.assertEqual(_parse_flag_default("3"), 3)
+        self.assertEqual(_parse_flag_default("-0.5"), -0.5)
+        self.assertEqual(_parse_flag_default('"png"'), "png")
+        self.assertIs(_parse_flag_default(True), True)
+
+    def test_arithmetic_float_default(self):
+        # e.g. gamma_correction in ConvertToBinary.cpp
+        default = _parse_flag_default("2.2 / 1.8")
+        self.assertIsInstance(default, float)
+        self.assertAlmostEqual(default, 2.2 / 1.8)
+        self.assertEqual(_parse_flag_default("-(1 + 2) * 4 % 5"), 3)
+
+    def test_unsupported_defaults_kept_raw(self):
+        for default in ["().__class__", "2 ** 8", "1 / 0", "x + 1", "1 << 4"]:
+            self.assertEqual(_parse_flag_default(default), default)
+
+
+if __name__ == "__main__":
+    unittest.main()